@@ -3,11 +3,16 @@ from contextlib import closing
 import os
 import sys
 
-from .debugger.debugger import Debugger, Listener
-from .debugger.breakpoints import KeywordBreakPoint, CallStackBreakPoint
+from .debugger.debugger import Debugger, Listener, AsyncListeners
+from .debugger.breakpoints import KeywordBreakPoint, CallStackBreakPoint, \
+    Scope
+from .debugger.condition import Condition
+from .debugger.filters import KeywordFilter
+from .debugger.dispatch import DispatchQueue
+from .sinks import FileSink
+from .debugger.runtime import BaseRuntime as RT  # noqa, N814
 from threading import Thread
 import logging
-import types
 
 
 class DebugSetting:
@@ -29,6 +34,8 @@ class DebugSetting:
 
         self.BPS_LIST = []
         self.WATCHING_LIST = []
+        self.IGNORE_LIBRARY_LIST = []
+        self.IGNORE_KEYWORD_LIST = []
         self.source_file = None
 
     def load_from_file(self, path):
@@ -71,31 +78,35 @@ class TelentMonitorProxy:
         self.logger = logging.getLogger("tel.monitor")
 
     def write(self, c):
-        for m in self.rdb.telnet_monitor_list:
-            try:
-                m.write(c)
-            except Exception as e:
-                self.logger.warning("Exception:%s in %s" % (e, m))
+        """queue the output to each monitor, it's written by the thread
+        of monitor."""
+        for m, queue in self.rdb.monitor_queues:
+            if not queue.put(c) and queue.disconnected:
+                self.logger.warning("monitor %s is too slow, disconnected. "
+                                    "dropped:%s" % (m, queue.dropped))
+                self.rdb.remove_telnet_monitor(m)
 
 
 class FileMonitor:
-    def __init__(self, path):
-        self.output = open(path, 'w')
+    def __init__(self, path, settings=None):
+        if settings is None:
+            self.output = FileSink(path, ascii_only=True)
+        else:
+            self.output = FileSink.from_settings(path, settings, True)
 
     def write(self, c):
-        for e in str(c):
-            if ord(e) > 128:
-                continue
-            self.output.write(e)
+        self.output.write(c)
 
     def close(self):
-        self.output.flush()
         self.output.close()
 
 
 class FileCaseStatus(Listener):
-    def __init__(self, path):
-        self.output = open(path, 'w')
+    def __init__(self, path, settings=None):
+        if settings is None:
+            self.output = FileSink(path)
+        else:
+            self.output = FileSink.from_settings(path, settings)
 
     def start_keyword(self, rt):
         if rt.rt_type == 'case':
@@ -111,11 +122,13 @@ class FileCaseStatus(Listener):
             self.output.write("%s\n" % (rt.attrs['status']))
 
     def close(self):
-        self.output.flush()
         self.output.close()
 
 
 class RobotDebugger:
+    BREAKPOINT_OPTIONS = ('if', 'on', 'hits', 'every', 'ignore',
+                          'tag', 'suite', 'test')
+
     def __init__(self, settings):
         self.bp_id = 0
         self.debugCtx = Debugger()
@@ -124,6 +137,7 @@ class RobotDebugger:
         self.watched_variable = []
         self.inteface_list = []
         self.telnet_monitor_list = []
+        self.monitor_queues = ()
         self.debug_listener = []
 
         if settings.endswith('.rdb'):
@@ -136,6 +150,19 @@ class RobotDebugger:
             self.logger = logging.getLogger("rdb.c")
             self.logger.info("starting robot debugger...")
 
+        if self.settings.LISTENER_DISPATCH == 'async':
+            self.debugCtx.set_listeners(
+                AsyncListeners(
+                    int(self.settings.LISTENER_QUEUE_SIZE),
+                    self.settings.LISTENER_OVERFLOW
+                )
+            )
+
+        self.keyword_filter = KeywordFilter(
+            self.settings.IGNORE_LIBRARY_LIST,
+            self.settings.IGNORE_KEYWORD_LIST
+        )
+
         for e in self.settings.BPS_LIST:
             self.add_breakpoint(e)
 
@@ -146,44 +173,117 @@ class RobotDebugger:
         self._exit_code = 0
 
     def add_breakpoint(self, bps):
-        if not bps.strip():
+        """Add a breakpoint, 'bps' is a keyword name or a call stack
+        separated by ';'. The options are appended after '|', e.g.
+        'Login | if=${count} > 100 | on=end'.
+
+        'hits=N' pauses on the Nth hit, 'every=N' pauses on every Nth hit
+        and 'ignore=N' skips the first N hits.
+
+        'tag', 'suite' and 'test' limit the breakpoint to the tests with
+        the tag, or the suite and test longname.
+        """
+        bp = self.build_breakpoint(bps)
+        if bp is None:
             return
-        if isinstance(bps, types.ListType):
-            self.debugCtx.add_breakpoint(
-                CallStackBreakPoint(
-                    'bp%s' % self.bp_id,
-                    bps
-                )
-            )
-        elif ";" in bps:
-            self.debugCtx.add_breakpoint(
-                CallStackBreakPoint(
-                    'bp%s' % self.bp_id,
-                    bps.split(";")
-                )
-            )
+        self.debugCtx.add_breakpoint(bp)
+        self.bp_id += 1
+
+    def build_breakpoint(self, bps):
+        """Return the breakpoint of 'bps' without adding it, None if it's
+        empty. RuntimeError is raised if it's invalid."""
+        if isinstance(bps, list):
+            bps = ";".join(bps)
+        if not bps.strip():
+            return None
+        bps, options = self.parse_breakpoint(bps)
+        name = 'bp%s' % self.bp_id
+        state = options.get('on', RT.START)
+        condition = None
+        if options.get('if'):
+            try:
+                condition = Condition(options['if'])
+            except SyntaxError as e:
+                raise RuntimeError("Invalid breakpoint condition '%s': %s"
+                                   % (options['if'], e))
+        if ";" in bps:
+            bp = CallStackBreakPoint(name, bps.split(";"), state, condition)
         else:
-            self.debugCtx.add_breakpoint(
-                KeywordBreakPoint(
-                    'bp%s' % self.bp_id,
-                    bps
-                )
+            bp = KeywordBreakPoint(name, bps, state, condition)
+        bp.hit_count = options.get('hits', 0)
+        bp.hit_every = options.get('every', 0)
+        bp.ignore_count = options.get('ignore', 0)
+        if 'tag' in options or 'suite' in options or 'test' in options:
+            bp.scope = Scope(
+                options.get('tag'),
+                options.get('suite'),
+                options.get('test')
             )
-        self.bp_id += 1
-        # self.debugCtx.add_breakpoint(KeywordBreakPoint('', bps))
+        return bp
+
+    def parse_breakpoint(self, bps):
+        target, options = bps.split("|")[0], {}
+        for e in bps.split("|")[1:]:
+            if "=" not in e:
+                raise RuntimeError("Invalid breakpoint option '%s'" % e)
+            name, value = e.split("=", 1)
+            options[name.strip().lower()] = value.strip()
+
+        for name in options:
+            if name not in self.BREAKPOINT_OPTIONS:
+                raise RuntimeError("Unknown breakpoint option '%s'" % name)
+        if options.get('on', RT.START) not in (RT.START, RT.END):
+            raise RuntimeError("The breakpoint state should be 'start' "
+                               "or 'end'.")
+        for name in ('hits', 'every', 'ignore'):
+            if name in options:
+                if not options[name].isdigit():
+                    raise RuntimeError("The breakpoint option '%s' should "
+                                       "be a number." % name)
+                options[name] = int(options[name])
+        return target.strip(), options
 
     def watch_variable(self, name):
         if not name.strip():
             return
         if name not in self.watched_variable:
             self.watched_variable.append(name)
+            self.debugCtx.changed()
 
     def remove_variable(self, name):
         if name in self.watched_variable:
             self.watched_variable.remove(name)
+            self.debugCtx.changed()
 
     def add_telnet_monitor(self, monitor):
+        queue = DispatchQueue(
+            monitor.write,
+            int(self.settings.MONITOR_QUEUE_SIZE),
+            self.settings.MONITOR_OVERFLOW,
+            "tel.monitor"
+        )
         self.telnet_monitor_list.append(monitor)
+        self.monitor_queues += ((monitor, queue), )
+
+    def remove_telnet_monitor(self, monitor):
+        queues = [e for e in self.monitor_queues if e[0] is monitor]
+        self.monitor_queues = tuple(
+            e for e in self.monitor_queues if e[0] is not monitor
+        )
+        if monitor in self.telnet_monitor_list:
+            self.telnet_monitor_list.remove(monitor)
+        for _, queue in queues:
+            # don't wait for the monitor, it may be blocked.
+            queue.close(0)
+
+    def monitor_stats(self):
+        """Return the lag and dropped counters of each telnet monitor."""
+        stats = []
+        for monitor, queue in self.monitor_queues:
+            stat = queue.stats()
+            stat['monitor'] = str(monitor)
+            stats.append(stat)
+        return stats
 
     @property
     def watching_variable(self):
@@ -240,13 +340,15 @@ class RobotDebugger:
             path = os.path.abspath(self.settings.CASE_STATUS_FILE)
             self.logger.info("output case status to: %s" % path)
             try:
-                listener = FileCaseStatus(path)
+                listener = FileCaseStatus(path, self.settings)
                 self.debug_listener.append(listener)
                 self.debugCtx.add_listener(listener)
             except Exception as e:
                 self.logger.exception(e)
 
     def close_telnet_monitor(self):
+        for _, queue in self.monitor_queues:
+            queue.close()
         for e in self.telnet_monitor_list:
             if hasattr(e, 'close'):
                 try:
@@ -267,6 +369,7 @@ class RobotDebugger:
     def close(self):
         self.logger.info("shutdown telnet monitor...")
         self.close_telnet_monitor()
+        self.debugCtx.listener.close()
         self.close_debug_listener()
 
         for e in self.inteface_list:
@@ -9,51 +9,111 @@ class Listener:
     def __init__(self, *bps, cfg='debug.rdb'):
         self.debugger = RobotDebugger(cfg)
         self.debugger.run()
-        self.call_stack = []
+        # the depth of started suites, tests and keywords, include the
+        # keywords skipped when the debugger is idle.
+        self.depth = 0
         self.debugCtx = self.debugger.debugCtx
+        self.call_stack = self.debugCtx.call_stack
+        self.ignored = self.debugger.keyword_filter.ignored
         self.logger = logging.getLogger("rbt.lis")
         for e in bps:
             self.debugger.add_breakpoint(e)
 
     def start_suite(self, name, attrs):
-        self.logger.debug("start_suite:%s, attr:%s" % (name, attrs))
-        self.call_stack.append(TestSuiteRuntime(name, attrs))
-        self.debugCtx.start_function(self.call_stack[-1])
+        self.logger.debug("start_suite:%s, attr:%s", name, attrs)
+        self.depth += 1
+        self.push(TestSuiteRuntime(name, attrs))
 
     def end_suite(self, name, attrs):
-        self.logger.debug("end_suite:%s, attr:%s" % (name, attrs))
-        self.call_stack[-1].attrs = attrs
-        self.debugCtx.end_function(self.call_stack[-1])
-        self.call_stack.pop()
+        self.logger.debug("end_suite:%s, attr:%s", name, attrs)
+        self.pop(attrs)
+        self.depth -= 1
 
     def start_test(self, name, attrs):
-        self.logger.debug("start_test:%s, attr:%s" % (name, attrs))
-        self.call_stack.append(TestCaseRuntime(name, attrs))
-        self.debugCtx.start_function(self.call_stack[-1])
+        self.logger.debug("start_test:%s, attr:%s", name, attrs)
+        self.depth += 1
+        self.push(TestCaseRuntime(name, attrs))
 
     def end_test(self, name, attrs):
-        self.logger.debug("end_test:%s, attr:%s" % (name, attrs))
-        self.call_stack[-1].attrs = attrs
-        self.debugCtx.end_function(self.call_stack[-1])
-        self.call_stack.pop()
+        self.logger.debug("end_test:%s, attr:%s", name, attrs)
+        self.pop(attrs)
+        self.depth -= 1
 
     def start_keyword(self, name, attrs):
-        self.logger.debug("start_keyword:%s, attr:%s" % (name, attrs))
-        if name.startswith("RDB."):
+        if self.ignored(name):
             return
+        self.depth += 1
+        if self.debugCtx.idle:
+            return
+        self.logger.debug("start_keyword:%s, attr:%s", name, attrs)
         if "." in name:
             _, name = name.split(".", 1)
-        self.call_stack.append(KeywordRuntime(name, attrs))
-        self.debugCtx.start_function(self.call_stack[-1])
+        self.push(KeywordRuntime(name, attrs))
 
     def end_keyword(self, name, attrs):
-        self.logger.debug("end_keyword:%s, attr:%s" % (name, attrs))
-        if name.startswith("RDB."):
+        if self.ignored(name):
+            return
+        depth, self.depth = self.depth, self.depth - 1
+        if self.call_stack.top.depth != depth:
+            # the keyword is started when the debugger is idle.
             return
-        self.call_stack[-1].attrs = attrs
-        self.debugCtx.end_function(self.call_stack[-1])
-        self.call_stack.pop()
+        self.logger.debug("end_keyword:%s, attr:%s", name, attrs)
+        self.pop(attrs)
+
+    def push(self, rt):
+        rt.depth = self.depth
+        self.debugCtx.start_function(rt)
+
+    def pop(self, attrs=None):
+        rt = self.call_stack.top
+        if attrs is None:
+            rt.reload_attrs()
+        else:
+            rt.attrs = attrs
+        self.debugCtx.end_function(rt)
 
     def close(self):
         self.logger.debug("close..................")
         self.debugger.close()
+
+
+class ListenerV3(Listener):
+    """The listener of API version 3, it works with the running and result
+    model of robot. The attributes are built only when they are asked for.
+
+    The keyword events are available since Robot Framework 7.
+    """
+    ROBOT_LISTENER_API_VERSION = 3
+
+    def start_suite(self, data, result):
+        self.depth += 1
+        self.push(TestSuiteRuntime(data.name, source=result))
+
+    def end_suite(self, data, result):
+        self.pop()
+        self.depth -= 1
+
+    def start_test(self, data, result):
+        self.depth += 1
+        self.push(TestCaseRuntime(data.name, source=result))
+
+    def end_test(self, data, result):
+        self.pop()
+        self.depth -= 1
+
+    def start_keyword(self, data, result):
+        if self.ignored(result.full_name):
+            return
+        self.depth += 1
+        if self.debugCtx.idle:
+            return
+        self.push(KeywordRuntime(result.name, source=result))
+
+    def end_keyword(self, data, result):
+        if self.ignored(result.full_name):
+            return
+        depth, self.depth = self.depth, self.depth - 1
+        if self.call_stack.top.depth != depth:
+            # the keyword is started when the debugger is idle.
+            return
+        self.pop()
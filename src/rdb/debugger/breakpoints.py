@@ -1,28 +1,110 @@
+import os
 import re
 import fnmatch
 from .runtime import BaseRuntime as RT  # noqa, N814
 from .runtime import KeywordRuntime
 
 
+class Scope:
+    """Limit a breakpoint to tests or suites. The tag, suite longname and
+    test longname are wildcard patterns matched case insensitively.
+    """
+
+    def __init__(self, tag=None, suite=None, test=None):
+        self.tag = tag
+        self.suite = suite
+        self.test = test
+        self.patterns = dict(
+            (name, re.compile(fnmatch.translate(value), re.I).match)
+            for name, value in (('tag', tag), ('suite', suite),
+                                ('test', test))
+            if value
+        )
+
+    def matched(self, rt):
+        """check if the keywords in suite or test 'rt' are in scope."""
+        longname = rt.longname
+        if 'suite' in self.patterns:
+            # the suite or any parent suite of it, the last name of a
+            # test is the test itself.
+            names = longname.split('.')
+            count = len(names) - 1 if rt.rt_type == 'case' else len(names)
+            if not any(self.patterns['suite']('.'.join(names[:i]))
+                       for i in range(1, count + 1)):
+                return False
+        if rt.rt_type != 'case':
+            return 'tag' not in self.patterns and 'test' not in self.patterns
+        if 'test' in self.patterns and not self.patterns['test'](longname):
+            return False
+        if 'tag' in self.patterns:
+            return any(self.patterns['tag'](e) for e in rt.tags or ())
+        return True
+
+    def __str__(self):
+        return ", ".join(
+            "%s=%s" % (name, getattr(self, name))
+            for name in ('tag', 'suite', 'test') if getattr(self, name)
+        )
+
+
 class BreakPoint:
-    def __init__(self, name):
+    def __init__(self, name, condition=None, scope=None):
         self.name = name
         self.active = True
         self.expired = False
+        self.condition = condition
+        self.scope = scope
+        # hits counted after the condition is passed.
+        self.hits = 0
+        self.hit_count = 0
+        self.hit_every = 0
+        self.ignore_count = 0
 
     def matched_context(self, stack):  # pylint: disable=W0613
         return False
 
+    def hit(self, rt):
+        """called after the breakpoint is matched with the top frame 'rt',
+        return True if the program should be paused."""
+        if self.condition is not None and not self.condition.evaluate(rt):
+            return False
+
+        self.hits += 1
+        if self.hits <= self.ignore_count:
+            return False
+        if self.hit_count:
+            return self.hits == self.hit_count
+        if self.hit_every:
+            return self.hits % self.hit_every == 0
+        return True
+
+    @property
+    def hit_condition(self):
+        if self.hit_count:
+            return "on %s" % self.hit_count
+        if self.hit_every:
+            return "every %s" % self.hit_every
+        if self.ignore_count:
+            return "after %s" % self.ignore_count
+        return ""
+
     def __str__(self):
         return "break:%s" % (self.name)
 
 
 class KeywordBreakPoint(BreakPoint):
-    def __init__(self, name, kw_name, state=RT.START):
-        super().__init__(name)
+    def __init__(self, name, kw_name, state=RT.START, condition=None):
+        super().__init__(name, condition)
         self.kw_name = kw_name
         self.state = state
-        self.pattern = '^' + kw_name.replace('*', '.*') + '$'
+        self.pattern = '^' + '.*'.join(
+            re.escape(e) for e in kw_name.split('*')
+        ) + '$'
+        self.regex = re.compile(self.pattern, re.I)
+
+    @property
+    def wildcard(self):
+        return '*' in self.kw_name
 
     def matched_context(self, stack):
         if not self.active or len(stack) <= 0:
@@ -30,91 +112,93 @@ class KeywordBreakPoint(BreakPoint):
 
         rt = stack[-1]
         if isinstance(rt, KeywordRuntime):
-            if (re.match(self.pattern, rt.name, re.I) and
+            if (self.regex.match(rt.name) and
                     rt.state == self.state):
                 return True
         return False
 
     def __str__(self):
+        if self.condition is not None:
+            return "break:%s, pattern=%s, if=%s" % (
+                self.name, self.kw_name, self.condition
+            )
         return "break:%s, pattern=%s" % (self.name, self.kw_name)
 
 
 class CallStackBreakPoint(BreakPoint):
-    def __init__(self, name, stack, state=RT.START):
-        super().__init__(name)
+    def __init__(self, name, stack, state=RT.START, condition=None):
+        super().__init__(name, condition)
         self.break_stack = stack
         self.state = state
         self.kw_name = ";".join(stack)
+        self.matchers = [
+            re.compile(fnmatch.translate(os.path.normcase(e))).match
+            for e in stack
+        ]
+
+    def advance(self, progress, name):
+        """Return the progress after a frame named 'name' is pushed on a
+        stack which have matched 'progress' patterns, and whether the
+        breakpoint is matched by the new top frame."""
+        name = os.path.normcase(name)
+        if (progress < len(self.matchers) and
+                self.matchers[progress](name)):
+            progress += 1
+        return (progress, progress == len(self.matchers) and
+                self.matchers[-1](name) is not None)
 
     def matched_context(self, stack):
         if not self.active or len(stack) <= 0:
             return False
 
-        if not fnmatch.fnmatch(str(stack[-1]), self.break_stack[-1]):
-            return False
-
-        bps = list(self.break_stack)
-        bps.reverse()
+        progress, matched = 0, False
         for e in stack:
-            if len(bps) == 0:
-                break
-            if fnmatch.fnmatch(str(e), bps[-1]):
-                bps.pop()
+            progress, matched = self.advance(progress, str(e))
 
-        return len(bps) == 0 and stack[-1].state == self.state
+        return matched and stack[-1].state == self.state
 
     def __str__(self):
-        return "break:%s, stack=%s" % (self.name, ";".join(self.break_stack))
-
+        if self.condition is not None:
+            return "break:%s, stack=%s, if=%s" % (
+                self.name, self.kw_name, self.condition
+            )
+        return "break:%s, stack=%s" % (self.name, self.kw_name)
 
-class RuntimeBreakPoint(BreakPoint):
-    def __init__(self, name, rt, state=RT.START):
-        super().__init__(name)
-        self.rt = rt
-        self.state = state
-        self.rt_done = False
-
-    def matched_context(self, stack):
-        if not self.active or len(stack) <= 0:
-            return False
 
-        if (self.rt_done and self.state == RT.DONE and
-                stack[-1].state == RT.START):
-            self.expired = True
-            return True
+class StepBreakPoint(BreakPoint):
+    """A pending step command of the debugger.
 
-        if stack[-1] == self.rt:
-            if stack[-1].state == self.state:
-                return True
-            if self.state == RT.DONE and stack[-1].state == RT.END:
-                # it's active at next step
-                self.rt_done = True
-                return False
-        return False
+    It's checked before the breakpoint table and only compares the
+    listener depth of the frame or counts down the started keywords.
+    """
+    STEPS = 'steps'
+    OVER = 'over'
+    RUN = 'run'
 
-    def __str__(self):
-        xx = str(self.rt)
-        return "Runtime break:%s, rt=%s, state=%s" % (
-            self.name, xx,
-            self.state
-        )
-
-
-class SemaphoreBreakPoint(BreakPoint):
-    def __init__(self, name, init_count=1):
+    def __init__(self, name, mode, depth=0, count=1):
         super().__init__(name)
-        self.semaphore = init_count
+        self.mode = mode
+        self.depth = depth
+        self.count = count
+
+    def matched_event(self, state, depth):
+        if self.mode == self.STEPS:
+            if state == RT.START:
+                self.count -= 1
+            self.expired = self.count <= 0
+        elif self.mode == self.OVER:
+            # paused at the next keyword out of current one.
+            self.expired = state == RT.START and depth <= self.depth
+        else:
+            self.expired = state == RT.END and depth == self.depth
+        return self.expired
 
     def matched_context(self, stack):
         if not self.active or len(stack) <= 0:
             return False
-
-        if stack[-1].state == RT.START:
-            self.semaphore -= 1
-
-        self.expired = self.semaphore == 0
-
-        return self.expired
+        return self.matched_event(stack[-1].state, stack[-1].depth)
 
     def __str__(self):
-        return "Semaphore break:%s, semaphore=%s" % (self.name, self.semaphore)
+        return "Step break:%s, mode=%s, depth=%s, count=%s" % (
+            self.name, self.mode, self.depth, self.count
+        )
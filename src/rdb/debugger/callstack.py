@@ -0,0 +1,53 @@
+class CallStack:
+    """The call stack shared by rdb.Listener and Debugger.
+
+    The storage is allocated in advance and doubled when it's full, push
+    and pop only move the top index.
+
+    The keywords started while the debugger is idle are not pushed, so
+    the stack may miss some ancestors of a keyword and call stack
+    breakpoints can't match them. The steps compare the listener depth
+    of the frames, which counts those keywords too.
+    """
+    __slots__ = ('frames', 'size')
+
+    def __init__(self, capacity=64):
+        self.frames = [None] * capacity
+        self.size = 0
+
+    def push(self, rt):
+        if self.size == len(self.frames):
+            self.frames.extend([None] * len(self.frames))
+        self.frames[self.size] = rt
+        self.size += 1
+
+    def pop(self):
+        if self.size == 0:
+            raise IndexError("pop from empty call stack")
+        self.size -= 1
+        rt, self.frames[self.size] = self.frames[self.size], None
+        return rt
+
+    @property
+    def top(self):
+        return self.frames[self.size - 1] if self.size else None
+
+    def __len__(self):
+        return self.size
+
+    def snapshot(self):
+        """Return a list of frames, it's safe to call in other threads
+        without lock. A frame being popped may be missed."""
+        return [e for e in self.frames[:self.size] if e is not None]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.snapshot()[index]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("call stack index out of range")
+        return self.frames[index]
+
+    def __iter__(self):
+        return iter(self.snapshot())
@@ -0,0 +1,52 @@
+import re
+import logging
+from .variables import variable_value
+
+
+class Condition:
+    """A breakpoint condition, e.g. "${count} > 100" or "status == 'FAIL'".
+
+    The robot variables are replaced with local names and the expression
+    is compiled once. The variables are resolved only when the condition
+    is evaluated, that's after the breakpoint is matched by name and state.
+    Other names are looked up in the listener attributes of the frame.
+    """
+    VARIABLE = re.compile(r'[$@&%]\{[^{}]+\}')
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.variables = {}
+        source = self.VARIABLE.sub(self._variable_name, expression.strip())
+        self.code = compile(source, '<breakpoint condition>', 'eval')
+        self.logger = logging.getLogger("core.bp")
+
+    def _variable_name(self, match):
+        name = '_rdb_var%s' % len(self.variables)
+        self.variables[name] = match.group(0)
+        return name
+
+    def evaluate(self, rt):
+        try:
+            return bool(eval(self.code, {}, ConditionScope(self, rt)))
+        except Exception as e:
+            # paused to let user to fix the condition.
+            self.logger.warning(
+                "failed to evaluate '%s': %s", self.expression, e
+            )
+            return True
+
+    def __str__(self):
+        return self.expression
+
+
+class ConditionScope:
+    def __init__(self, condition, rt):
+        self.condition = condition
+        self.rt = rt
+
+    def __getitem__(self, name):
+        if name in self.condition.variables:
+            return variable_value(self.condition.variables[name])
+        if name in ('name', 'state'):
+            return getattr(self.rt, name)
+        return self.rt.attrs[name]
@@ -1,89 +1,227 @@
 import logging
 import threading
-from .breakpoints import SemaphoreBreakPoint, RuntimeBreakPoint
-from .runtime import BaseRuntime
+from contextlib import contextmanager
+from .dispatch import DispatchQueue
+from .breakpoints import StepBreakPoint
+from .callstack import CallStack
+from .index import BreakPointIndex
+from .runtime import BaseRuntime, RuntimeSnapshot
 
 
 class Debugger:
     def __init__(self, ):
         self.lock = threading.Condition()
-        self.call_stack = []
+        self.bp_lock = threading.RLock()
+        # the step commands from concurrent clients are serialized, the
+        # robot thread doesn't take this lock.
+        self.command_lock = threading.RLock()
+        self.call_stack = CallStack()
+        # bumped whenever the state shown by the interfaces is changed,
+        # 'structure' only when the program is paused or resumed, or the
+        # breakpoints or variables are changed, not by the call stack.
+        self.generation = 0
+        self.structure = 0
+        self.state_changed = threading.Condition(threading.Lock())
+        # the thread applying a batch, its changes are published once.
+        self.batch_thread = None
+        self.batch_depth = 0
+        self.batch_index = False
+        self.batch_changed = False
         self.break_points = []
+        self.bp_index = BreakPointIndex()
         self.active_break_point = None
+        self.step = None
         self.listener = Listeners()
         self.logger = logging.getLogger("core.dbg")
+        # nothing to check or notify, the listener may skip the keywords.
+        self.idle = True
 
     def go_steps(self, count):
-        self.logger.debug("go_steps:%s" % count)
-        if self.paused():
-            bp = SemaphoreBreakPoint('', count)
-            self.add_breakpoint(bp)
-            self.go_on()
-        else:
-            raise RuntimeError("the program have not paused!")
+        with self.command_lock:
+            self.logger.debug("go_steps:%s" % count)
+            if self.paused():
+                bp = StepBreakPoint('', StepBreakPoint.STEPS, count=count)
+                self.set_step(bp)
+                self.go_on()
+            else:
+                raise RuntimeError("the program have not paused!")
 
     def go_into(self):
         self.go_steps(1)
 
     def go_over(self):
-        self.logger.debug("go_over...")
-        if self.paused():
-            bp = RuntimeBreakPoint('', self.call_stack[-1], BaseRuntime.DONE)
-            self.add_breakpoint(bp)
-            self.go_on()
-        else:
-            raise RuntimeError("the program have not paused!")
+        with self.command_lock:
+            self.logger.debug("go_over...")
+            if self.paused():
+                bp = StepBreakPoint(
+                    '',
+                    StepBreakPoint.OVER,
+                    self.call_stack[-1].depth
+                )
+                self.set_step(bp)
+                self.go_on()
+            else:
+                raise RuntimeError("the program have not paused!")
 
     def go_run(self):
         """run current keyword. paused when the keyword is called.
             if the current keyword is called, go_run is ignored.
         """
-        if self.paused():
-            if self.call_stack[-1].state == BaseRuntime.START:
-                bp = RuntimeBreakPoint(
-                    '',
-                    self.call_stack[-1],
-                    BaseRuntime.END
-                )
-                self.add_breakpoint(bp)
-                self.go_on()
+        with self.command_lock:
+            if self.paused():
+                if self.call_stack[-1].state == BaseRuntime.START:
+                    bp = StepBreakPoint(
+                        '',
+                        StepBreakPoint.RUN,
+                        self.call_stack[-1].depth
+                    )
+                    self.set_step(bp)
+                    self.go_on()
+                else:
+                    pass
             else:
-                pass
-        else:
-            raise RuntimeError("the program have not paused!")
+                raise RuntimeError("the program have not paused!")
 
     def go_return(self):
-        self.logger.debug("go_return...")
-        if self.paused():
-            if len(self.call_stack) > 1:
-                bp = RuntimeBreakPoint(
-                    '',
-                    self.call_stack[-2],
-                    BaseRuntime.DONE
-                )
-                self.add_breakpoint(bp)
-            self.go_on()
-        else:
-            raise RuntimeError("the program have not paused!")
+        with self.command_lock:
+            self.logger.debug("go_return...")
+            if self.paused():
+                if self.call_stack[-1].depth > 1:
+                    bp = StepBreakPoint(
+                        '',
+                        StepBreakPoint.OVER,
+                        self.call_stack[-1].depth - 1
+                    )
+                    self.set_step(bp)
+                self.go_on()
+            else:
+                raise RuntimeError("the program have not paused!")
 
     def go_pause(self):
         """schedule to pause the program."""
-        self.logger.debug("go_pause...")
-        if self.active_break_point is None:
-            self.add_breakpoint(SemaphoreBreakPoint('', 1))
-        else:
-            self.logger.warning("the program is already paused!")
-            raise RuntimeError("the program is already paused!")
+        with self.command_lock:
+            self.logger.debug("go_pause...")
+            if self.active_break_point is None:
+                self.set_step(StepBreakPoint('', StepBreakPoint.STEPS))
+            else:
+                self.logger.warning("the program is already paused!")
+                raise RuntimeError("the program is already paused!")
+
+    def set_step(self, step):
+        self.step = step
+        self.update_idle()
 
     def add_breakpoint(self, bp):
-        self.break_points.insert(0, bp)
+        with self.bp_lock:
+            self.break_points.insert(0, bp)
+            self.rebuild_index()
 
     def remove_breakpoint(self, bp):
-        self.break_points.remove(bp)
+        with self.bp_lock:
+            self.break_points.remove(bp)
+            self.rebuild_index()
+
+    def enable_breakpoint(self, bp, active=True):
+        with self.bp_lock:
+            bp.active = active
+            self.rebuild_index()
+
+    def disable_breakpoint(self, bp):
+        self.enable_breakpoint(bp, False)
+
+    @contextmanager
+    def batch(self):
+        """apply many changes as one, the index is rebuilt and the
+        generation is bumped once when the batch is done."""
+        with self.bp_lock:
+            if self.batch_depth == 0:
+                self.batch_thread = threading.get_ident()
+            self.batch_depth += 1
+            try:
+                yield self
+            finally:
+                self.batch_depth -= 1
+                if self.batch_depth == 0:
+                    self.batch_thread = None
+                    rebuild, self.batch_index = self.batch_index, False
+                    changed, self.batch_changed = self.batch_changed, False
+                    if rebuild:
+                        self.rebuild_index()
+                    elif changed:
+                        self.changed()
+
+    def save_breakpoints(self):
+        """the breakpoints with their flags, and the changes of the
+        running batch which aren't published yet."""
+        with self.bp_lock:
+            return ([(bp, bp.active, bp.hits) for bp in self.break_points],
+                    (self.batch_index, self.batch_changed))
+
+    def restore_breakpoints(self, saved):
+        """restore the breakpoints returned by save_breakpoints. Nothing
+        is published if they aren't changed, in a batch the changes made
+        after saving are discarded."""
+        entries, pending = saved
+        with self.bp_lock:
+            unchanged = (
+                [e[0] for e in entries] == self.break_points and
+                all(bp.active == active and bp.hits == hits
+                    for bp, active, hits in entries)
+            )
+            for bp, active, hits in entries:
+                bp.active, bp.hits = active, hits
+            self.break_points[:] = [e[0] for e in entries]
+            if (self.batch_thread is not None and
+                    self.batch_thread == threading.get_ident()):
+                self.batch_index, self.batch_changed = pending
+            elif not unchanged:
+                self.rebuild_index()
+
+    def rebuild_index(self):
+        """the index is replaced as a whole, the robot thread is reading
+        it without lock."""
+        with self.bp_lock:
+            if self.batch_thread is not None:
+                self.batch_index = True
+                return
+            self.bp_index = BreakPointIndex(self.break_points)
+            self.update_idle()
+            self.changed()
+
+    def changed(self, structural=True):
+        """the state of call stack, breakpoints or variables is changed,
+        the call stack only changes are not 'structural'."""
+        if (self.batch_thread is not None and
+                self.batch_thread == threading.get_ident()):
+            self.batch_changed = True
+            return
+        with self.state_changed:
+            self.generation += 1
+            if structural:
+                self.structure += 1
+            self.state_changed.notify_all()
+
+    def wait_changed(self, generation, timeout=None):
+        """block until the generation isn't 'generation' or timeout,
+        return the current generation."""
+        with self.state_changed:
+            self.state_changed.wait_for(
+                lambda: self.generation != generation, timeout
+            )
+            return self.generation
+
+    def update_idle(self):
+        self.idle = (
+            self.step is None and
+            len(self.bp_index) == 0 and
+            not self.listener.listeners
+        )
 
     def start_function(self, func):
         try:
-            self.call_stack.append(func)
+            self.call_stack.push(func)
+            self.bp_index.push(self.call_stack)
+            self.changed(False)
 
             func.state = BaseRuntime.START
             self.listener.start_keyword(func)
@@ -110,36 +248,42 @@ class Debugger:
             self.check_break_points()
             self.call_stack.pop()
             func.state = BaseRuntime.DONE
+            self.changed(False)
         except BaseException as e:
             self.logger.exception(e)
             raise
 
     def check_break_points(self):
-        matched_bps = []
-
-        for bp in list(self.break_points):
-            if bp.expired:
-                self.remove_breakpoint(bp)
-                continue
-            if bp.active and bp.matched_context(self.call_stack):
-                matched_bps.append(bp)
-
-        # all break points should be checked, because the 'expired' need
-        # evaluated.
-        # but the program paused once.
+        # the steps compare the listener depth, it counts the keywords
+        # which are skipped while the debugger is idle.
+        rt = self.call_stack[-1]
+        step = self.step
+        if step is not None and step.matched_event(rt.state, rt.depth):
+            self.pause(step)
+            return
+
+        matched_bps = self.bp_index.match(self.call_stack)
+        if len(matched_bps) > 0:
+            matched_bps = [bp for bp in matched_bps if bp.hit(rt)]
         if len(matched_bps) > 0:
             self.pause(matched_bps[0])
 
     def pause(self, breakpoint):  # pylint: disable=W0622
-        self.active_break_point = breakpoint
+        # the pending step is finished or interrupted by a breakpoint.
+        self.set_step(None)
+        with self.lock:
+            self.active_break_point = breakpoint
+        self.changed()
 
         self.listener.pause(breakpoint)
 
-        bp = self.active_break_point
+        bp = breakpoint
         self.logger.debug("paused at '%s'" % bp)
-        self.lock.acquire()
-        self.lock.wait()
-        self.lock.release()
+        # a 'go on' from another thread may come before the wait, the
+        # active breakpoint is checked under the lock so it isn't lost.
+        with self.lock:
+            while self.active_break_point is not None:
+                self.lock.wait()
         self.logger.debug("break paused %s..." % bp)
 
     def paused(self):
@@ -147,20 +291,33 @@ class Debugger:
         return self.active_break_point is not None
 
     def go_on(self):
-        self.logger.debug("go on from active bp:%s" % self.active_break_point)
-        if self.active_break_point is not None:
-            self.active_break_point = None
-            self.lock.acquire()
-            self.lock.notify()
-            self.lock.release()
-
-        self.listener.go_on()
+        with self.command_lock:
+            self.logger.debug(
+                "go on from active bp:%s" % self.active_break_point
+            )
+            with self.lock:
+                if self.active_break_point is not None:
+                    self.active_break_point = None
+                    self.lock.notify()
+            self.changed()
+
+            self.listener.go_on()
+
+    def set_listeners(self, listeners):
+        """replace the dispatcher of listeners, e.g. with AsyncListeners."""
+        for e in self.listener.listeners:
+            listeners.add_listener(e)
+        self.listener, old = listeners, self.listener
+        old.close()
+        self.update_idle()
 
     def add_listener(self, listener):
         self.listener.add_listener(listener)
+        self.update_idle()
 
     def remove_listener(self, listener):
         self.listener.remove_listener(listener)
+        self.update_idle()
 
 
 class Listener:
@@ -205,3 +362,76 @@ class Listeners(Listener):
 
     def remove_listener(self, listener):
         self.listeners.remove(listener)
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class AsyncListeners(Listeners):
+    """Deliver start_keyword and end_keyword in a background thread.
+
+    pause and go_on are still called on the robot thread, after the
+    queued events are delivered.
+    """
+
+    def __init__(self, size=1024, policy=DispatchQueue.BLOCK):
+        super().__init__()
+        self.queue = DispatchQueue(self.deliver, size, policy,
+                                   "core.listener", self.merge)
+        # the frames whose start_keyword is dropped.
+        self.dropped = set()
+
+    @staticmethod
+    def merge(events):
+        """drop a queued start_keyword with the end_keyword of the same
+        frame, so the listeners never see unbalanced events."""
+        started = {}
+        for i, (method, _, frame) in enumerate(events):
+            if method == 'start_keyword':
+                started[frame] = i
+            elif frame in started:
+                del events[i]
+                del events[started[frame]]
+                return True
+        return False
+
+    def deliver(self, event):
+        method, keyword, _ = event
+        for listener in self.listeners:
+            try:
+                getattr(listener, method)(keyword)
+            except Exception as e:
+                self.queue.logger.exception(e)
+
+    def pause(self, breakpoint):  # pylint: disable=W0622
+        self.queue.flush()
+        super().pause(breakpoint)
+
+    def go_on(self):
+        self.queue.flush()
+        super().go_on()
+
+    # the frame is changed before the event is delivered, a snapshot of
+    # it is queued.
+    # the end of a keyword is dropped only with its start, it waits for
+    # the worker if the queue is full.
+    def start_keyword(self, keyword):
+        event = ('start_keyword', RuntimeSnapshot(keyword), id(keyword))
+        if not self.queue.put(event):
+            self.dropped.add(id(keyword))
+
+    def end_keyword(self, keyword):
+        if id(keyword) in self.dropped:
+            self.dropped.discard(id(keyword))
+            return
+        event = ('end_keyword', RuntimeSnapshot(keyword), id(keyword))
+        self.queue.put(event, True)
+
+    def stats(self):
+        return self.queue.stats()
+
+    def close(self):
+        self.queue.close()
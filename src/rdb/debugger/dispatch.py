@@ -0,0 +1,166 @@
+import time
+import logging
+import threading
+from collections import deque
+
+
+class DispatchQueue:
+    """A bounded queue delivered by a background thread.
+
+    The producer only appends to a deque, it's atomic and doesn't take a
+    lock. The worker is woken up only when it's waiting for events.
+
+    When the queue is full, the 'block' policy waits for the worker,
+    'drop' discards the new event, 'coalesce' calls 'merge' to shrink the
+    queued events and waits like 'block' if nothing can be merged, and
+    'disconnect' drops all events from then on, the owner should remove
+    the consumer. Without 'merge', coalesce discards the oldest event,
+    it's only fit for events which don't depend on each other.
+    """
+    BLOCK = 'block'
+    DROP = 'drop'
+    COALESCE = 'coalesce'
+    DISCONNECT = 'disconnect'
+    POLICIES = (BLOCK, DROP, COALESCE, DISCONNECT)
+
+    def __init__(self, deliver, size=1024, policy=BLOCK, name='rdb.queue',
+                 merge=None):
+        if policy not in self.POLICIES:
+            raise RuntimeError("Unknown overflow policy '%s'" % policy)
+        self.deliver = deliver
+        self.size = size
+        self.policy = policy
+        self.merge = merge or self.drop_oldest
+        self.events = deque()
+        # taken by the worker only when events are merged in place.
+        self.lock = threading.Lock()
+        self.blocked = False
+        self.space = threading.Event()
+        self.queued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self.disconnected = False
+        self.waiting = False
+        self.busy = False
+        self.wakeup = threading.Event()
+        self.logger = logging.getLogger(name)
+        self.thread = threading.Thread(target=self.run, name=name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, event, force=False):
+        """queue the event, False if it's dropped. A 'force' event waits
+        for the worker instead of being dropped or merged."""
+        if self.disconnected:
+            self.dropped += 1
+            return False
+        if len(self.events) >= self.size and force:
+            self.wait_space()
+        elif len(self.events) >= self.size:
+            if self.policy == self.DISCONNECT:
+                self.disconnected = True
+                self.events.clear()
+            if self.policy in (self.DROP, self.DISCONNECT):
+                self.dropped += 1
+                return False
+            merged = False
+            if self.policy == self.COALESCE:
+                with self.lock:
+                    merged = self.merge(self.events)
+                if merged:
+                    self.coalesced += 1
+            if not merged:
+                self.wait_space()
+
+        self.events.append(event)
+        self.queued += 1
+        if self.waiting:
+            self.waiting = False
+            self.wakeup.set()
+        return True
+
+    @staticmethod
+    def drop_oldest(events):
+        try:
+            events.popleft()
+            return True
+        except IndexError:
+            return False
+
+    def wait_space(self):
+        """wait until the worker takes an event from the full queue."""
+        self.blocked = True
+        while len(self.events) >= self.size and not self.closed:
+            # cleared before the check, the worker sets it after taking
+            # an event, so the wakeup isn't lost.
+            self.space.clear()
+            if len(self.events) < self.size:
+                break
+            self.space.wait(0.1)
+        self.blocked = False
+
+    def run(self):
+        events = self.events
+        locked = self.policy == self.COALESCE
+        while not self.closed or events:
+            # busy is set before the event is taken, flush() either sees
+            # the event in queue or the worker is busy.
+            self.busy = True
+            try:
+                if locked:
+                    with self.lock:
+                        event = events.popleft()
+                else:
+                    event = events.popleft()
+            except IndexError:
+                self.busy = False
+                # set the flag before checking again, put() either sees
+                # the flag or the worker sees the event.
+                self.waiting = True
+                if not events:
+                    self.wakeup.wait(0.5)
+                self.wakeup.clear()
+                self.waiting = False
+                continue
+
+            if self.blocked:
+                self.space.set()
+            try:
+                self.deliver(event)
+            except Exception as e:
+                self.logger.exception(e)
+            self.delivered += 1
+            self.busy = False
+
+    @property
+    def lag(self):
+        return len(self.events)
+
+    def flush(self, timeout=30):
+        """wait until all queued events are delivered."""
+        deadline = time.time() + timeout
+        while ((self.events or self.busy) and
+               self.thread.is_alive() and time.time() < deadline):
+            if self.waiting:
+                self.wakeup.set()
+            time.sleep(0.001)
+
+    def close(self, timeout=30):
+        self.flush(timeout)
+        self.closed = True
+        self.wakeup.set()
+        self.space.set()
+        self.thread.join(timeout)
+
+    def stats(self):
+        return {
+            'policy': self.policy,
+            'lag': self.lag,
+            'queued': self.queued,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'disconnected': self.disconnected,
+        }
@@ -0,0 +1,43 @@
+import re
+import fnmatch
+
+
+class KeywordFilter:
+    """The keywords which are not tracked by the debugger.
+
+    The library and keyword names are matched case insensitively, the
+    keyword names can be wildcard patterns. The result of each name is
+    cached, so the check is a dict lookup after the first call. The
+    keywords of 'RDB' are run by the debugger itself and always ignored.
+    """
+    MAX_CACHE = 10000
+
+    def __init__(self, libraries=(), keywords=()):
+        self.libraries = tuple(set(
+            e.strip().lower() + '.' for e in libraries if e.strip()
+        ) | set(['rdb.']))
+        keywords = [e.strip().lower() for e in keywords if e.strip()]
+        self.keywords = frozenset(e for e in keywords if '*' not in e)
+        patterns = [fnmatch.translate(e) for e in keywords if '*' in e]
+        self.pattern = patterns and re.compile("|".join(patterns)).match
+        self.cache = {}
+
+    def ignored(self, name):
+        """'name' is the full name of keyword, e.g. 'BuiltIn.Log'."""
+        result = self.cache.get(name)
+        if result is None:
+            if len(self.cache) > self.MAX_CACHE:
+                self.cache.clear()
+            result = self.cache[name] = self._ignored(name.lower())
+        return result
+
+    def _ignored(self, name):
+        if name.startswith(self.libraries):
+            return True
+        names = [name]
+        if "." in name:
+            names.append(name.split(".", 1)[1])
+        for e in names:
+            if e in self.keywords or (self.pattern and self.pattern(e)):
+                return True
+        return False
@@ -0,0 +1,233 @@
+import re
+from .runtime import BaseRuntime as RT  # noqa, N814
+from .breakpoints import KeywordBreakPoint, CallStackBreakPoint
+
+EMPTY_SCOPE = frozenset()
+
+
+class WildcardMatcher:
+    """Case insensitive matcher for many '*' patterns at once.
+
+    All patterns are simulated as one automaton. The state sets reached
+    while scanning names are cached as a DFA, so one pass over a keyword
+    name returns every matched breakpoint.
+    """
+    MAX_STATES = 4096
+
+    def __init__(self, break_points=()):
+        groups = {}
+        for bp in break_points:
+            pattern = re.sub(r'\*+', '*', bp.kw_name.lower())
+            groups.setdefault(pattern, []).append(bp)
+
+        self.patterns = list(groups.keys())
+        self.groups = [tuple(e) for e in groups.values()]
+        self.start = self._closure(
+            [(i, 0) for i in range(len(self.patterns))]
+        )
+        self.reset()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def reset(self):
+        self.transitions = {}
+        self.accepted = {}
+
+    def match(self, name):
+        state = self.start
+        transitions = self.transitions
+        for c in name.lower():
+            row = transitions.get(state)
+            if row is None:
+                if len(transitions) > self.MAX_STATES:
+                    self.reset()
+                    transitions = self.transitions
+                row = transitions[state] = {}
+            next_state = row.get(c)
+            if next_state is None:
+                next_state = row[c] = self._step(state, c)
+            if not next_state:
+                return ()
+            state = next_state
+
+        bps = self.accepted.get(state)
+        if bps is None:
+            bps = self.accepted[state] = self._accepted(state)
+        return bps
+
+    def _closure(self, positions):
+        closure = set()
+        patterns = self.patterns
+        for i, pos in positions:
+            closure.add((i, pos))
+            while pos < len(patterns[i]) and patterns[i][pos] == '*':
+                pos += 1
+                closure.add((i, pos))
+        return frozenset(closure)
+
+    def _step(self, state, c):
+        positions = []
+        patterns = self.patterns
+        for i, pos in state:
+            if pos >= len(patterns[i]):
+                continue
+            if patterns[i][pos] == '*':
+                positions.append((i, pos))
+            elif patterns[i][pos] == c:
+                positions.append((i, pos + 1))
+        return self._closure(positions)
+
+    def _accepted(self, state):
+        bps = []
+        for i, pos in state:
+            if pos == len(self.patterns[i]):
+                bps.extend(self.groups[i])
+        return tuple(bps)
+
+
+class StateTable:
+    """Breakpoints which can only match one runtime state."""
+
+    def __init__(self):
+        self.keywords = {}
+        self.wildcards = WildcardMatcher()
+
+    def add_keywords(self, bps):
+        wildcards = []
+        for bp in bps:
+            if bp.wildcard:
+                wildcards.append(bp)
+            else:
+                self.keywords.setdefault(bp.kw_name.lower(), []).append(bp)
+        self.wildcards = WildcardMatcher(wildcards)
+
+    def match(self, rt, matched):
+        if rt.rt_type == 'kw':
+            matched.extend(self.keywords.get(rt.name.lower(), ()))
+            if self.wildcards:
+                matched.extend(self.wildcards.match(rt.name))
+
+
+class BreakPointIndex:
+    """A read only lookup structure built from the breakpoint list.
+
+    The debugger builds a new index whenever a breakpoint is added,
+    removed, enabled or disabled, so the robot thread never sees a half
+    updated table. Disabled breakpoints are left out of the tables.
+    """
+
+    def __init__(self, break_points=()):
+        self.tables = {RT.START: StateTable(), RT.END: StateTable()}
+        self.stacks = []
+        self.others = []
+        self.scoped = []
+        self.order = {}
+
+        keywords = dict((state, []) for state in self.tables)
+        for i, bp in enumerate(break_points):
+            if not bp.active:
+                continue
+            self.order[bp] = i
+            if bp.scope is not None:
+                self.scoped.append(bp)
+            state = getattr(bp, 'state', None)
+            if state in self.tables and type(bp) is KeywordBreakPoint:
+                keywords[state].append(bp)
+            elif state in self.tables and type(bp) is CallStackBreakPoint:
+                self.stacks.append(bp)
+            else:
+                self.others.append(bp)
+
+        for state, bps in keywords.items():
+            self.tables[state].add_keywords(bps)
+        self.start_progress = (0, ) * len(self.stacks)
+        self.unscoped = len(self.order) - len(self.scoped)
+        # the frames need per frame state of this index.
+        self.tracking = bool(self.stacks or self.scoped)
+
+    def __len__(self):
+        return len(self.order)
+
+    def match(self, stack):
+        """Return the breakpoints matched with the top of call stack,
+        the first one is the most recently added."""
+        rt = stack[-1]
+        if self.tracking:
+            if rt.bp_index is not self:
+                self.refresh(stack)
+            if not rt.checked:
+                return []
+
+        matched = []
+        for bp in self.others:
+            if bp.active and bp.matched_context(stack):
+                matched.append(bp)
+
+        table = self.tables.get(rt.state)
+        if table is not None:
+            table.match(rt, matched)
+
+        if self.stacks:
+            for bp in rt.stack_matched:
+                if bp.state == rt.state:
+                    matched.append(bp)
+
+        if self.scoped and matched:
+            matched = [bp for bp in matched
+                       if bp.scope is None or bp in rt.scope_bps]
+        if len(matched) > 1:
+            matched.sort(key=self.order.__getitem__)
+        return matched
+
+    def push(self, stack):
+        """Record the state of the new top frame, it's based on the state
+        of the parent frame."""
+        if not self.tracking:
+            return
+        parent = None
+        if len(stack) > 1:
+            parent = stack[-2]
+            if parent.bp_index is not self:
+                self.refresh(stack[:-1])
+        self.track(stack[-1], parent)
+
+    def refresh(self, stack):
+        """The frames pushed before this index was built are recomputed
+        once from the bottom of the stack."""
+        parent = None
+        for rt in stack:
+            self.track(rt, parent)
+            parent = rt
+
+    def track(self, rt, parent):
+        rt.bp_index = self
+        if parent is None:
+            progress, scope_bps = self.start_progress, EMPTY_SCOPE
+            checked = True
+        else:
+            progress, scope_bps = parent.stack_progress, parent.scope_bps
+            checked = parent.checked
+
+        if rt.rt_type != 'kw' and self.scoped:
+            # the scope is changed by suites and tests only.
+            scope_bps = frozenset(
+                bp for bp in self.scoped if bp.scope.matched(rt)
+            )
+            checked = bool(self.unscoped or scope_bps)
+        rt.scope_bps, rt.checked = scope_bps, checked
+
+        if not checked or not self.stacks:
+            # no breakpoint could be matched in the subtree.
+            rt.stack_progress, rt.stack_matched = progress, ()
+            return
+
+        name = str(rt)
+        rt_progress, rt_matched = [], []
+        for bp, count in zip(self.stacks, progress):
+            count, matched = bp.advance(count, name)
+            rt_progress.append(count)
+            if matched:
+                rt_matched.append(bp)
+        rt.stack_progress = tuple(rt_progress)
+        rt.stack_matched = tuple(rt_matched)
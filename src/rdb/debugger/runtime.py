@@ -1,15 +1,57 @@
+from types import MappingProxyType
+
+
 class BaseRuntime:
+    """A frame in the call stack.
+
+    Only the fields used to match breakpoints are kept in slots. The
+    listener attributes are kept as given, or are built from the robot
+    model 'source' when they are asked for the first time.
+    """
     START = 'start'
     RUNNING = 'running'
     END = 'end'
     DONE = 'done'
 
-    def __init__(self, object, type, attrs):  # pylint: disable=W0622
-        self.object = object
-        self.result = None
+    rt_type = None
+
+    __slots__ = ('name', 'state', 'result', 'depth', '_attrs', '_source',
+                 # per frame state of breakpoints, see BreakPointIndex.track
+                 'bp_index', 'stack_progress', 'stack_matched', 'scope_bps',
+                 'checked')
+
+    def __init__(self, name, attrs=None, source=None):
+        self.name = name
         self.state = self.START
-        self.rt_type = type
-        self.attrs = attrs
+        self.result = None
+        self.depth = 0
+        self._attrs = attrs
+        self._source = source
+        self.bp_index = None
+        self.stack_progress = ()
+        self.stack_matched = ()
+        self.scope_bps = frozenset()
+        self.checked = True
+
+    @property
+    def object(self):
+        return self.name
+
+    @property
+    def attrs(self):
+        if self._attrs is None:
+            self._attrs = model_attrs(self._source)
+        return self._attrs
+
+    @attrs.setter
+    def attrs(self, attrs):
+        self._attrs = attrs
+        self._source = None
+
+    def reload_attrs(self):
+        """the model is updated, the attributes are built again lazily."""
+        if self._source is not None:
+            self._attrs = None
 
     def __getattr__(self, name):
         if name.startswith('__'):
@@ -18,28 +60,97 @@ class BaseRuntime:
 
 
 class KeywordRuntime(BaseRuntime):
-    def __init__(self, object, attrs):  # pylint: disable=W0622
-        super().__init__(object, 'kw', attrs)
-        self.name = object
-        self.keyword = object
+    rt_type = 'kw'
+
+    __slots__ = ()
+
+    @property
+    def keyword(self):
+        return self.name
 
     def __str__(self):
         return "kw:%s" % self.name
 
 
 class TestSuiteRuntime(BaseRuntime):
-    def __init__(self, object, attrs):  # pylint: disable=W0622
-        super().__init__(object, 'suite', attrs)
-        self.name = object
+    rt_type = 'suite'
+
+    __slots__ = ()
 
     def __str__(self):
         return "suite:%s" % self.name
 
 
 class TestCaseRuntime(BaseRuntime):
-    def __init__(self, object, attrs):  # pylint: disable=W0622
-        super().__init__(object, 'case', attrs)
-        self.name = object
+    rt_type = 'case'
+
+    __slots__ = ()
 
     def __str__(self):
         return "test:%s" % self.name
+
+
+class RuntimeSnapshot:
+    """A read only copy of a frame, taken when an event is queued.
+
+    The frame itself is changed by the robot thread before a queued event
+    is delivered, the snapshot keeps the state and attributes of the
+    event time.
+    """
+    __slots__ = ('name', 'rt_type', 'state', 'depth', 'attrs', 'text')
+
+    def __init__(self, rt):
+        setter = super().__setattr__
+        setter('name', rt.name)
+        setter('rt_type', rt.rt_type)
+        setter('state', rt.state)
+        setter('depth', rt.depth)
+        setter('attrs', MappingProxyType(dict(rt.attrs)))
+        setter('text', str(rt))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("The snapshot of '%s' is read only." % self)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError('Internal Attribute %s.' % name)
+        return self.attrs.get(name, "")
+
+    def __str__(self):
+        return self.text
+
+
+MODEL_ATTRS = (
+    ('doc', ('doc', )),
+    ('longname', ('full_name', 'longname')),
+    ('starttime', ('starttime', 'start_time')),
+    ('endtime', ('endtime', 'end_time')),
+    ('elapsedtime', ('elapsedtime', 'elapsed_time')),
+    ('status', ('status', )),
+    ('message', ('message', )),
+    ('tags', ('tags', )),
+    ('args', ('args', )),
+    ('type', ('type', )),
+    ('libname', ('owner', 'libname')),
+)
+
+
+def model_attrs(model):
+    """Build the attributes of listener API v2 from a robot result model
+    object, it's used by the listener API v3."""
+    attrs = {}
+    if model is None:
+        return attrs
+
+    for key, names in MODEL_ATTRS:
+        for name in names:
+            value = getattr(model, name, None)
+            if value is not None:
+                break
+        if value is None:
+            continue
+        if key in ('tags', 'args'):
+            attrs[key] = [str(e) for e in value]
+        else:
+            attrs[key] = str(value)
+    return attrs
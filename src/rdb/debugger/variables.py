@@ -0,0 +1,13 @@
+def variable_value(name):
+    """Return the value of a robot variable in current namespace, None if
+    the variable is not existing."""
+    from robot.running import NAMESPACES
+    if NAMESPACES.current is None:
+        return None
+
+    try:
+        return NAMESPACES.current.variables.replace_scalar(name)
+    except Exception as e:
+        if "Non-existing" in str(e):
+            return None
+        raise
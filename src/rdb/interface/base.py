@@ -1,4 +1,6 @@
 import logging
+from contextlib import contextmanager
+from rdb.debugger.variables import variable_value
 
 
 class BaseDebugInterface:
@@ -36,6 +38,10 @@ class BaseDebugInterface:
     def add_breakpoint(self, bp):
         self.robotDebugger.add_breakpoint(bp)
 
+    def check_breakpoint(self, bp):
+        """Raise RuntimeError if the breakpoint 'bp' is invalid."""
+        self.robotDebugger.build_breakpoint(bp)
+
     def watch_variable(self, name):
         return self.robotDebugger.watch_variable(name)
 
@@ -49,24 +55,10 @@ class BaseDebugInterface:
         from robot.running import NAMESPACES
         if NAMESPACES.current is not None:
             NAMESPACES.current.variables[name] = value
+            self.debugCtx.changed()
 
     def variable_value(self, var_list):
-        from robot.running import NAMESPACES
-        if NAMESPACES.current is None:
-            return [(e, None) for e in var_list]
-
-        robot_vars = NAMESPACES.current.variables
-        val_list = []
-        for e in var_list:
-            try:
-                v = robot_vars.replace_scalar(e)
-            except Exception as et:
-                if "Non-existing" in str(et):
-                    v = None
-                else:
-                    raise
-            val_list.append((e, v))
-        return val_list
+        return [(e, variable_value(e)) for e in var_list]
 
     @property
     def watching_variable(self):
@@ -86,20 +78,57 @@ class BaseDebugInterface:
     def active_breakpoint(self):
         return self.debugCtx.active_break_point
 
+    @property
+    def generation(self):
+        """Return the counter of changes of debugger state."""
+        return self.debugCtx.generation
+
+    @property
+    def structure(self):
+        """Return the counter of changes other than the call stack."""
+        return self.debugCtx.structure
+
+    @contextmanager
+    def batch(self):
+        """The changes in the context are applied as one. If it fails, the
+        breakpoints, watched variables and the breakpoint id are restored,
+        and the state isn't published as changed."""
+        with self.debugCtx.batch():
+            break_points = self.debugCtx.save_breakpoints()
+            watched = list(self.robotDebugger.watched_variable)
+            bp_id = self.robotDebugger.bp_id
+            try:
+                yield
+            except BaseException:
+                self.robotDebugger.watched_variable[:] = watched
+                self.robotDebugger.bp_id = bp_id
+                self.debugCtx.restore_breakpoints(break_points)
+                raise
+
+    def wait_changed(self, generation, timeout=None):
+        """Block until the debugger state is changed from 'generation'."""
+        return self.debugCtx.wait_changed(generation, timeout)
+
     def disable_breakpoint(self, name, match_kw=False):
         bp = self._get_breakpoint(name, match_kw)
         if bp:
-            bp.active = False
+            self.debugCtx.disable_breakpoint(bp)
 
     def enable_breakpoint(self, name, match_kw=False):
         bp = self._get_breakpoint(name, match_kw)
         if bp:
-            bp.active = True
+            self.debugCtx.enable_breakpoint(bp)
 
     def update_breakpoint(self, name, match_kw=False):
         bp = self._get_breakpoint(name, match_kw)
         if bp:
-            bp.active = not bp.active
+            self.debugCtx.enable_breakpoint(bp, not bp.active)
+
+    def reset_breakpoint_hits(self, name, match_kw=False):
+        bp = self._get_breakpoint(name, match_kw)
+        if bp:
+            bp.hits = 0
+            self.debugCtx.changed()
 
     def _get_breakpoint(self, name, match_kw):
         for e in self.debugCtx.break_points:
@@ -113,6 +142,16 @@ class BaseDebugInterface:
         """this is IPAMml special feature."""
         self.robotDebugger.add_telnet_monitor(monitor)
 
+    @property
+    def listener_stats(self):
+        """Return the counters of async listener dispatch."""
+        return self.debugCtx.listener.stats()
+
+    @property
+    def monitor_stats(self):
+        """Return the lag and dropped counters of telnet monitors."""
+        return self.robotDebugger.monitor_stats()
+
     def add_debug_listener(self, listener):
         self.debugCtx.add_listener(listener)
 
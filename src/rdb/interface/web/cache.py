@@ -0,0 +1,131 @@
+import os
+import gzip
+import zlib
+import hashlib
+import importlib
+import threading
+from collections import OrderedDict
+from robot.serializing import Template
+from . import templates
+
+
+class TemplateCache:
+    """The page templates are parsed once and kept for the next requests.
+
+    A parsed template keeps its output while generating, so a copy is
+    taken from a shared pool for each page and put back when it's done.
+    New copies are parsed only when all are in use. In the reload mode,
+    the templates module is reloaded when the file is changed, it's used
+    to edit the pages.
+    """
+    POOL_SIZE = 8
+
+    def __init__(self, reload=False):
+        self.reload = reload
+        self.lock = threading.Lock()
+        self.pool = {}
+        self.generation = 0
+        self.parsed = 0
+        self.mtime = self.module_mtime()
+
+    @staticmethod
+    def module_mtime():
+        try:
+            return os.stat(templates.__file__).st_mtime
+        except OSError:
+            return None
+
+    def check_module(self):
+        mtime = self.module_mtime()
+        if mtime == self.mtime:
+            return
+        with self.lock:
+            if mtime != self.mtime:
+                importlib.reload(templates)
+                self.mtime = mtime
+                self.generation += 1
+                self.pool = {}
+
+    def acquire(self, name):
+        if self.reload:
+            self.check_module()
+        with self.lock:
+            free = self.pool.get(name)
+            if free:
+                return free.pop(), self.generation
+            generation = self.generation
+            self.parsed += 1
+        return Template(template=getattr(templates, name)), generation
+
+    def release(self, name, template, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            free = self.pool.setdefault(name, [])
+            if len(free) < self.POOL_SIZE:
+                free.append(template)
+
+    def generate(self, name, namespace):
+        template, generation = self.acquire(name)
+        try:
+            return template.generate(namespace)
+        finally:
+            self.release(name, template, generation)
+
+
+class CompressCache:
+    """The compressed bodies, keyed by the digest of content and the
+    encoding. An unchanged page or state is compressed only once."""
+    ENCODINGS = ('gzip', 'deflate')
+
+    def __init__(self, size=64):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data, encoding):
+        key = (hashlib.sha1(data).digest(), encoding)
+        with self.lock:
+            compressed = self.entries.get(key)
+            if compressed is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return compressed
+
+        compressed = self.compress(data, encoding)
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = compressed
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return compressed
+
+    @staticmethod
+    def compress(data, encoding):
+        if encoding == 'gzip':
+            return gzip.compress(data, 6, mtime=0)
+        return zlib.compress(data, 6)
+
+    @classmethod
+    def accepted(cls, accept_encoding):
+        """the preferred encoding in header 'Accept-Encoding', or None."""
+        accepted = {}
+        for e in accept_encoding.lower().split(','):
+            name, _, params = e.strip().partition(';')
+            quality = 1.0
+            if params.strip().startswith('q='):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[name.strip()] = quality
+        for encoding in cls.ENCODINGS:
+            quality = accepted.get(encoding, accepted.get('*', 0.0))
+            if quality > 0:
+                return encoding
+        return None
+
+
+TEMPLATES = TemplateCache()
@@ -0,0 +1,82 @@
+import inspect
+
+
+def to_bool(value):
+    return value.strip().lower() in ('y', 'yes', 'true', 'on', '1')
+
+
+# the parameters are converted by the type of default value.
+CONVERTERS = {
+    bool: to_bool,
+    int: int,
+    float: float,
+}
+
+
+class Command:
+    """A callable with the argument spec, it's inspected once when the
+    command is registered. 'check' is called with the bound arguments,
+    it raises RuntimeError if they can't be run."""
+
+    def __init__(self, name, func, check=None):
+        self.name = name
+        self.func = func
+        self.check = check
+        self.required = []
+        self.optional = []
+        self.converters = {}
+        for param in inspect.signature(func).parameters.values():
+            if param.kind not in (param.POSITIONAL_OR_KEYWORD,
+                                  param.KEYWORD_ONLY):
+                continue
+            if param.default is param.empty:
+                self.required.append(param.name)
+            else:
+                self.optional.append(param.name)
+                converter = CONVERTERS.get(type(param.default))
+                if converter is not None:
+                    self.converters[param.name] = converter
+
+    def bind(self, params):
+        """return the keyword arguments from the request parameters."""
+        kw_args = {}
+        for name in self.required:
+            if name not in params:
+                raise RuntimeError("Not found required parameter '%s'" % name)
+            kw_args[name] = params[name]
+        for name in self.optional:
+            if name in params:
+                converter = self.converters.get(name)
+                value = params[name]
+                try:
+                    kw_args[name] = converter(value) if converter else value
+                except ValueError:
+                    raise RuntimeError(
+                        "Invalid parameter %s='%s'" % (name, value)
+                    )
+        if self.check is not None:
+            self.check(**kw_args)
+        return kw_args
+
+    def __call__(self, params):
+        return self.func(**self.bind(params))
+
+
+class CommandRegistry:
+    """The commands which can be called by URL, name to Command."""
+
+    def __init__(self):
+        self.commands = {}
+
+    def __contains__(self, name):
+        return name in self.commands
+
+    def add(self, name, func, check=None):
+        self.commands[name] = Command(name, func, check)
+
+    def add_methods(self, obj, names):
+        for name in names:
+            self.add(name, getattr(obj, name))
+
+    def get(self, name):
+        return self.commands.get(name)
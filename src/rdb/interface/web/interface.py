@@ -1,61 +1,232 @@
+import json
 import logging
 import sys
 import re
-import random
 import socket
 import os
 import subprocess
-import importlib
-from time import time
+import threading
+from time import time, sleep
 from datetime import datetime
 from urllib.parse import urlparse, unquote
 from urllib.request import urlopen
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from robot.serializing import Template, Namespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from robot.serializing import Namespace
 from rdb.interface import BaseDebugInterface
-from rdb.debugger.breakpoints import KeywordBreakPoint
+from rdb.debugger.breakpoints import KeywordBreakPoint, CallStackBreakPoint
 from .views import BreakPointView, CallStackView
-from . import templates
+from .cache import TEMPLATES, CompressCache
+from .commands import CommandRegistry
+from .sessions import SessionTable
 from . import standalone
 
+# the breakpoint types in the JSON state.
+BREAKPOINT_TYPES = {
+    KeywordBreakPoint: 'keyword',
+    CallStackBreakPoint: 'stack',
+}
+
+
+class WebServer(ThreadingHTTPServer):
+    """Serve each connection in a thread, the count of threads is bounded.
+
+    The accept loop never blocks, a connection over the limit is answered
+    with 503 at once. The long-lived requests, the monitor stream and
+    the state polls, can't take the last 'reserved_threads' threads, so
+    there is always a thread for the commands like 'go_on'.
+
+    The views only read snapshots of the debugger state, they don't take
+    locks which are used by the robot thread.
+    """
+    block_on_close = False
+    # seconds a state poll is blocked, and the shortest interval between
+    # the updates sent while robot is running.
+    wait_timeout = 30
+    update_interval = 1
+    # the smaller bodies are sent as is.
+    compress_min_size = 512
+
+    def __init__(self, server_address, handler, max_threads=64,
+                 request_timeout=60, reserved_threads=8):
+        super().__init__(server_address, handler)
+        self.max_threads = max_threads
+        self.reserved_threads = min(reserved_threads, max_threads - 1)
+        self.request_timeout = request_timeout
+        self.lock = threading.Lock()
+        self.threads = 0
+        self.streams = 0
+        self.compress = True
+        self.compressed = CompressCache()
+
+    @property
+    def crowded(self):
+        """only the reserved threads are left."""
+        return self.threads >= self.max_threads - self.reserved_threads
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            full = self.threads >= self.max_threads
+            if not full:
+                self.threads += 1
+        if full:
+            self.reject(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            self.release_thread()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.release_thread()
+
+    def release_thread(self):
+        with self.lock:
+            self.threads -= 1
+
+    def reject(self, request):
+        try:
+            request.sendall(b"HTTP/1.1 503 Service Unavailable\r\n"
+                            b"Retry-After: 1\r\n"
+                            b"Content-Length: 0\r\n"
+                            b"Connection: close\r\n\r\n")
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def start_stream(self):
+        """take a thread for a long-lived request, False if only the
+        reserved threads are left for them."""
+        with self.lock:
+            if self.streams >= self.max_threads - self.reserved_threads:
+                return False
+            self.streams += 1
+            return True
+
+    def end_stream(self):
+        with self.lock:
+            self.streams -= 1
+
 
 class WebHandler(BaseHTTPRequestHandler):
+    # the connections are kept alive, every response needs the length.
+    protocol_version = "HTTP/1.1"
+    # the largest body of a batch request.
+    MAX_BATCH_BYTES = 1 << 20
+
+    def setup(self):
+        # a slow client can't keep the thread forever.
+        self.timeout = self.server.request_timeout
+        super().setup()
+
     def do_GET(self, ):  # noqa, N802
         self.logger = logger = logging.getLogger("rdb.web")
         try:
+            if urlparse(self.path).path == '/monitor':
+                return self.response_monitor()
+            if urlparse(self.path).path == '/monitor_stream':
+                return self.response_stream(self.response_monitor_stream)
+            if urlparse(self.path).path == '/api/state':
+                return self.response_api_state()
+            if urlparse(self.path).path == '/api/wait':
+                return self.response_stream(self.response_api_wait)
             output = self.process()
-
-            self.send_response(200)
-            self.send_header("Content-type", "text/html")
-            self.send_header("Cache-Control", "no-cache")
-            self.send_header("Expires", self.date_time_string(time()))
-            self.send_header("Last-Modified", self.date_time_string(time()))
-            self.send_header("Content-Length", len(output))
-            self.end_headers()
-
-            self.wfile.write(output)
+            if output is None:
+                # redirected after a command.
+                return
+            if isinstance(output, str):
+                output = output.encode('utf-8')
+
+            self.send_content(200, "text/html; charset=utf-8", output, (
+                ("Cache-Control", "no-cache"),
+                ("Expires", self.date_time_string(time())),
+                ("Last-Modified", self.date_time_string(time())),
+            ))
         except BaseException as e:
             logger.exception(e)
+            # the response may be incomplete.
+            self.close_connection = True
             return "Error:%s" % e
 
+    def do_POST(self, ):  # noqa, N802
+        self.logger = logger = logging.getLogger("rdb.web")
+        try:
+            if urlparse(self.path).path == '/api/batch':
+                return self.response_api_batch()
+            self.send_error(404)
+        except BaseException as e:
+            logger.exception(e)
+            self.close_connection = True
+
+    def response_stream(self, response):
+        """run a long-lived response, 503 is sent if the threads left are
+        reserved for the commands."""
+        if not self.server.start_stream():
+            return self.send_content(503, "text/plain", b"server is busy",
+                                     (("Retry-After", "5"), ))
+        try:
+            return response()
+        finally:
+            self.server.end_stream()
+
+    def send_content(self, code, content_type, data, headers=()):
+        """send the body, it's compressed if the client accepts it."""
+        encoding = None
+        if (self.server.compress and
+                len(data) >= self.server.compress_min_size):
+            encoding = CompressCache.accepted(
+                self.headers.get("Accept-Encoding", "")
+            )
+        if encoding is not None:
+            data = self.server.compressed.get(data, encoding)
+
+        self.send_response(code)
+        self.send_header("Content-type", content_type)
+        for name, value in headers:
+            self.send_header(name, value)
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        if self.server.crowded:
+            # the idle connection doesn't keep a thread.
+            self.send_header("Connection", "close")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
     def process(self):
+        """run the command and redirect to the refresh page, the result is
+        shown there. Reloading the page doesn't run the command again."""
         logger = self.logger
         self.rbt_debugger = self.server.robot_debugger
+        sessions = self.server.sessions
 
         # output = "xx:%s,\n%s" % (self.server.debug_interface, self.path)
         url = urlparse(self.path)
-        command_name = command = url.path.split("/")[1]
+        command_name = url.path.split("/")[1]
         params = self.params = self.__parse_param(url.query)
-        if self.check_session(params):
-            logger.debug("command:%s,%s" % (command, str(params)))
-            if command and hasattr(self.rbt_debugger, command):
-                command = getattr(self.rbt_debugger, command)
-            elif command and hasattr(self, command):
-                command = getattr(self, command)
-            if callable(command):
-                status, msg = self.execute(command, params)
+        if self.check_session(params, create=True):
+            logger.debug("command:%s,%s" % (command_name, str(params)))
+            command = self.rbt_debugger.commands.get(command_name)
+            result = None
+            if command_name == 'refresh':
+                result = sessions.pop_result(self.session)
+            if result is not None:
+                command_name, status, msg, kw = result
+                params['kw'] = kw
+            elif command is None:
+                status = 'ERR'
+                msg = "Not found command '%s'" % command_name
             else:
-                status, msg = ('ERR', "Not found command '%s'" % command)
+                status, msg = self.execute(command, params)
+                if command_name != 'refresh':
+                    sessions.set_result(self.session, (
+                        command_name, status, msg, params.get('kw', '')
+                    ))
+                    return self.redirect('/refresh?sid=%s' % self.session)
         else:
             status = 'ERR'
             msg = 'debug session error'
@@ -63,24 +234,245 @@ class WebHandler(BaseHTTPRequestHandler):
         output = self.response_views(command_name, status, msg)
         return output
 
-    def refresh(self):
-        return "status at %s" % datetime.now()
+    def redirect(self, location):
+        self.send_response(303)
+        self.send_header("Location", location)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def response_monitor(self):
+        """the telnet output after 'offset', the new offset is returned in
+        header 'X-Monitor-Offset'."""
+        params = self.__parse_param(urlparse(self.path).query)
+        offset = params.get("offset", "0")
+        monitor = self.server.robot_debugger.telnetMonitor
+        data, offset = monitor.read(int(offset) if offset.isdigit() else 0)
+
+        self.send_content(200, "text/plain; charset=ascii", data, (
+            ("Cache-Control", "no-cache"),
+            ("X-Monitor-Offset", str(offset)),
+        ))
+
+    def response_monitor_stream(self):
+        """push the telnet output as server-sent events. The stream starts
+        at 'offset', or the last event id when the browser reconnects."""
+        params = self.__parse_param(urlparse(self.path).query)
+        offset = self.headers.get("Last-Event-ID") or params.get("offset")
+        monitor = self.server.robot_debugger.telnetMonitor
+        offset = int(offset) if offset and offset.isdigit() else 0
+
+        self.send_response(200)
+        self.send_header("Content-type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
 
-    def check_session(self, params):
-        session = params.get("sid", "").strip()
-        result = session and self.server.sid and session == self.server.sid
-        self.server.sid = str(random.random())
-        return result
+        try:
+            while True:
+                data, offset = monitor.read(offset)
+                if data:
+                    lines = data.replace(b"\r", b"").split(b"\n")
+                    self.wfile.write(b"id: %d\n" % offset)
+                    self.wfile.write(
+                        b"".join(b"data: %s\n" % e for e in lines) + b"\n"
+                    )
+                else:
+                    # keep the connection alive through the proxies.
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+                monitor.wait(offset, 15)
+        except (BrokenPipeError, ConnectionResetError):
+            self.logger.debug("monitor stream is closed by client.")
+
+    def response_api_state(self):
+        """the debugger state as JSON. The ETag is the state generation, a
+        poll with 'If-None-Match' gets 304 if nothing is changed."""
+        rdb = self.server.robot_debugger
+        # the generation is read first, a change while building the state
+        # is sent again on the next poll.
+        generation = rdb.generation
+        etag = '"%x-%d"' % (id(rdb.debugCtx), generation)
+        self.send_state(rdb, generation, etag,
+                        etag in self.headers.get("If-None-Match", ""))
+
+    def response_api_wait(self):
+        """block until the state generation isn't 'generation', then send
+        the state like /api/state. 304 is sent if nothing is changed."""
+        params = self.__parse_param(urlparse(self.path).query)
+        last = params.get("generation", "")
+        last = int(last) if last.isdigit() else -1
+        rdb = self.server.robot_debugger
+
+        generation = rdb.wait_changed(last, self.server.wait_timeout)
+        if generation != last and rdb.active_breakpoint is None:
+            # the call stack is changed by every keyword, the changes are
+            # collected for a while so a client is updated once in the
+            # interval.
+            sleep(self.server.update_interval)
+            generation = rdb.generation
+        etag = '"%x-%d"' % (id(rdb.debugCtx), generation)
+        self.send_state(rdb, generation, etag, generation == last)
+
+    def send_state(self, rdb, generation, etag, not_modified):
+        if not_modified:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+        self.send_json(200, self.api_state(rdb, generation), etag)
+
+    def send_json(self, code, obj, etag=None):
+        data = json.dumps(obj, separators=(',', ':')).encode('utf-8')
+        headers = [("Cache-Control", "no-cache")]
+        if etag is not None:
+            headers.append(("ETag", etag))
+        self.send_content(code, "application/json", data, headers)
+
+    def response_api_batch(self):
+        """run a JSON list of commands, e.g.
+        [{"command": "add_breakpoint", "params": {"bp": "Login"}}, ...].
+
+        Only the commands in BATCH_COMMANDS, which change the breakpoints
+        and watched variables, can be run. All commands and parameters,
+        and the breakpoint specs, are checked before the first one is run.
+        The commands are run in one debugger batch, the breakpoint index is
+        rebuilt and the state generation bumped once. If a command fails,
+        all changes are undone and the state isn't changed.
+        """
+        rdb = self.rbt_debugger = self.server.robot_debugger
+        params = self.__parse_param(urlparse(self.path).query)
+        if not self.check_session(params):
+            # the body isn't read, the connection can't be reused. A new
+            # token is got by loading the page.
+            self.close_connection = True
+            return self.send_json(403, {'status': 'ERR',
+                                        'msg': 'debug session error'})
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            return self.send_json(400, {'status': 'ERR',
+                                        'msg': 'invalid Content-Length',
+                                        'sid': self.session})
+        if length > self.MAX_BATCH_BYTES:
+            self.close_connection = True
+            return self.send_json(413, {'status': 'ERR',
+                                        'msg': 'batch is too large',
+                                        'sid': self.session})
+
+        commands = []
+        try:
+            items = json.loads(self.rfile.read(length).decode('utf-8'))
+            for i, item in enumerate(items):
+                name = item.get('command')
+                command = rdb.commands.get(name)
+                if command is None:
+                    raise RuntimeError(
+                        "%d: Not found command '%s'" % (i, name)
+                    )
+                if name not in rdb.BATCH_COMMANDS:
+                    raise RuntimeError(
+                        "%d: Command '%s' can't be run in batch" % (i, name)
+                    )
+                args = dict((k, str(v))
+                            for k, v in item.get('params', {}).items())
+                try:
+                    commands.append((command, command.bind(args)))
+                except RuntimeError as e:
+                    raise RuntimeError("%d: %s" % (i, e))
+        except (ValueError, TypeError, AttributeError, RuntimeError) as e:
+            return self.send_json(400, {'status': 'ERR', 'msg': str(e),
+                                        'sid': self.session})
+
+        results = []
+        status, msg = 'OK', ''
+        try:
+            with rdb.batch():
+                for i, (command, kw_args) in enumerate(commands):
+                    try:
+                        result = command.func(**kw_args)
+                    except Exception as e:
+                        self.logger.exception(e)
+                        status, msg = 'ERR', "%d: %s" % (i, e)
+                        raise
+                    results.append(result and str(result) or '')
+        except Exception:
+            # the batch is rolled back.
+            results = []
+
+        self.send_json(200, {'status': status, 'msg': msg,
+                             'results': results,
+                             'generation': rdb.generation,
+                             'sid': self.session})
+
+    @staticmethod
+    def api_state(rdb, generation):
+        active_bp = rdb.active_breakpoint
+        call_stack = [
+            {
+                'type': e.rt_type,
+                'name': e.name,
+                'state': e.state,
+                'starttime': e.starttime,
+            } for e in rdb.callstack
+        ]
+        break_points = [
+            {
+                'name': e.name,
+                'type': BREAKPOINT_TYPES.get(type(e), type(e).__name__),
+                'kw_name': getattr(e, 'kw_name', ''),
+                'state': getattr(e, 'state', ''),
+                'active': e.active,
+                'hits': e.hits,
+                'hit_condition': e.hit_condition,
+                'condition': e.condition and e.condition.expression,
+                'scope': e.scope and {
+                    'tag': e.scope.tag,
+                    'suite': e.scope.suite,
+                    'test': e.scope.test,
+                },
+            } for e in rdb.breakpoints
+        ]
+        variables = [
+            [name, None if value is None else str(value)]
+            for name, value in rdb.variable_value(rdb.watching_variable)
+        ]
+        return {
+            'generation': generation,
+            'structure': rdb.structure,
+            'status': 'paused' if active_bp is not None else 'running',
+            'active_breakpoint': None if active_bp is None else str(active_bp),
+            'call_stack': call_stack,
+            'break_points': break_points,
+            'variables': variables,
+        }
+
+    def check_session(self, params, create=False):
+        """the token of this client is kept. If it's missing or expired, a
+        new one is given only with 'create', it's used to render the page,
+        so the failed API calls can't evict the tokens of other clients."""
+        sessions = self.server.sessions
+        self.session = params.get("sid", "").strip()
+        if self.session and sessions.check(self.session):
+            return True
+        self.session = sessions.create() if create else None
+        return False
 
     def log_message(self, format, *args):  # pylint: disable=W0622
         self.logger.debug(format % args)
 
     def response_views(self, command, status, msg):
-        importlib.reload(templates)
-
-        debugger_template = templates.DEBUGGER_TEMPLATE
-
         rdb = self.rbt_debugger
+        # the page updates the call stack when the state is changed from
+        # this one, and is reloaded for other changes.
+        generation = rdb.generation
+        structure = rdb.structure
 
         break_points = [
             BreakPointView(e) for e in rdb.breakpoints
@@ -102,7 +494,6 @@ class WebHandler(BaseHTTPRequestHandler):
             listener_attrs = call_stack[0].attrs
         else:
             listener_attrs = {}
-        keys = listener_attrs.keys()
         attr_order = ['doc', 'longname', 'starttime', 'endtime', 'elapsetime',
                       'tags', 'status', 'message', 'statistics']
 
@@ -112,10 +503,7 @@ class WebHandler(BaseHTTPRequestHandler):
             except ValueError:
                 return 999
 
-        def cmp(a, b):
-            return (a > b) - (a < b)
-
-        keys.sort(lambda x, y: cmp(index_attr(x), index_attr(y)))
+        keys = sorted(listener_attrs, key=index_attr)
         cur_attrs = []
         for e in keys:
             def a():
@@ -159,8 +547,6 @@ class WebHandler(BaseHTTPRequestHandler):
             robot_status.name = "Running....."
             robot_status.css_class = "running"
 
-        refresh_interval = "120" if rdb.active_breakpoint else "1"
-
         namespace = Namespace(
             call_stack=call_stack,
             break_points=break_points,
@@ -172,32 +558,17 @@ class WebHandler(BaseHTTPRequestHandler):
             robot_status=robot_status,
             cur_attrs=cur_attrs,
             cur_variables=cur_variables,
-            refresh_interval=refresh_interval,
-            session=self.server.sid,
+            generation=generation,
+            structure=structure,
+            session=self.session,
             kw=self.params.get("kw", '')
         )
 
-        return Template(template=debugger_template).generate(namespace)
+        return TEMPLATES.generate('DEBUGGER_TEMPLATE', namespace)
 
     def execute(self, command, params):
-        if command.func_defaults:
-            reqiured_args_count = (
-                command.func_code.co_argcount - len(command.func_defaults)
-            )
-        else:
-            reqiured_args_count = command.func_code.co_argcount
-
-        var_names = command.func_code.co_varnames
-        reqiured_args, options_args = (
-            var_names[:reqiured_args_count],
-            var_names[reqiured_args_count:]
-        )
-
         try:
-            args, kw_args = (
-                self.__parse_args(params, reqiured_args, options_args)
-            )
-            result = command(*args, **kw_args)
+            result = command(params)
         except BaseException as e:
             self.logger.exception(e)
             return ('ERR', str(e))
@@ -213,47 +584,94 @@ class WebHandler(BaseHTTPRequestHandler):
             p[k] = unquote(v)
         return p
 
-    def __parse_args(self, args, reqiured_args, options_args):
-        param = []
-        for name in reqiured_args:
-            if 'self' == name:
-                continue
-            if not args.has_key(name):
-                raise RuntimeError("Not found required parameter '%s'" % name)
-            param.append(args[name])
-        kw_param = {}
-        for name in options_args:
-            if args.has_key(name):
-                kw_param[str(name)] = args[name]
-        return (param, kw_param)
-
 
 class TelnetMonitor:
+    """Keep the latest telnet output in a ring buffer.
+
+    'offset' counts all bytes ever written, a client passes the offset it
+    has read to get only the new output. The output is escaped to html
+    when it's read.
+    """
+    HTML_ESCAPE = {
+        ord('\n'): '<br/>',
+        ord(' '): '&nbsp;',
+        ord('>'): '&gt;',
+        ord('<'): '&lt;',
+        ord('&'): '&amp;',
+    }
+
     def __init__(self, size=16 * 1024):
-        self.html_output = ''
+        self.ring = bytearray(size)
         self.buffer_size = size
+        self.offset = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
 
     def write(self, c):
-        for e in str(c):
-            if ord(e) > 128:
-                continue
-            self.html_output += {
-                '\n': '<br/>',
-                ' ': '&nbsp;',
-                '>': '&gt;',
-                '<': '&lt;',
-            }.get(e, e)
+        data = str(c).encode('ascii', 'ignore')
+        if not data:
+            return
+        size = self.buffer_size
+        with self.lock:
+            offset = self.offset + len(data)
+            data = data[-size:]
+            pos = (offset - len(data)) % size
+            first = min(len(data), size - pos)
+            self.ring[pos:pos + first] = data[:first]
+            self.ring[:len(data) - first] = data[first:]
+            self.offset = offset
+            self.changed.notify_all()
+
+    def read(self, offset=0):
+        """Return the bytes written after 'offset' and the new offset.
+        The bytes dropped from the ring buffer are skipped."""
+        size = self.buffer_size
+        with self.lock:
+            end = self.offset
+            start = min(max(offset, end - size, 0), end)
+            pos, length = start % size, end - start
+            if pos + length <= size:
+                data = bytes(self.ring[pos:pos + length])
+            else:
+                data = bytes(self.ring[pos:]) + \
+                    bytes(self.ring[:pos + length - size])
+        return data, end
+
+    def wait(self, offset, timeout=None):
+        """block until there is output after 'offset'."""
+        with self.lock:
+            if self.offset <= offset:
+                self.changed.wait(timeout)
+            return self.offset
 
-        self.html_output = self.html_output[-self.buffer_size:]
+    def read_html(self, offset=0):
+        data, offset = self.read(offset)
+        return data.decode('ascii').translate(self.HTML_ESCAPE), offset
 
     @property
     def buffer(self):
-        return self.html_output
+        return self.read_html()[0]
 
 
 class WebDebugger(BaseDebugInterface):
+    # the methods which can be called by URL.
+    COMMANDS = ('go_steps', 'go_into', 'go_over', 'go_on', 'go_return',
+                'go_pause', 'add_breakpoint', 'watch_variable',
+                'remove_variable', 'update_variable', 'run_keyword',
+                'enable_breakpoint', 'disable_breakpoint',
+                'update_breakpoint', 'reset_breakpoint_hits', 'refresh')
+    # the commands which can be run in /api/batch, they can be undone.
+    BATCH_COMMANDS = ('add_breakpoint', 'enable_breakpoint',
+                      'disable_breakpoint', 'update_breakpoint',
+                      'reset_breakpoint_hits', 'watch_variable',
+                      'remove_variable')
+
     def start(self, cfg):
         self.cfg = cfg
+        self.commands = CommandRegistry()
+        self.commands.add_methods(self, self.COMMANDS)
+        self.commands.add('add_breakpoint', self.add_breakpoint,
+                          self.check_breakpoint)
         if cfg.WEB_PROXY == 'Y':
             server_address = (cfg.WEB_BIND, 0)
             self.proxy_address = ("127.0.0.1", cfg.WEB_PORT)
@@ -261,10 +679,23 @@ class WebDebugger(BaseDebugInterface):
         else:
             server_address = (cfg.WEB_BIND, int(cfg.WEB_PORT))
 
-        httpd = HTTPServer(server_address, WebHandler)
+        httpd = WebServer(
+            server_address,
+            WebHandler,
+            int(cfg.WEB_MAX_THREADS),
+            int(cfg.WEB_TIMEOUT),
+            int(cfg.WEB_RESERVED_THREADS)
+        )
         httpd.robot_debugger = self
-        httpd.sid = ""
-        self.telnetMonitor = TelnetMonitor()
+        httpd.sessions = SessionTable(
+            int(cfg.WEB_MAX_SESSIONS),
+            int(cfg.WEB_SESSION_EXPIRES)
+        )
+        httpd.wait_timeout = float(cfg.WEB_WAIT_TIMEOUT)
+        httpd.update_interval = float(cfg.WEB_UPDATE_INTERVAL)
+        httpd.compress = cfg.WEB_COMPRESS == 'Y'
+        TEMPLATES.reload = cfg.WEB_TEMPLATE_RELOAD == 'Y'
+        self.telnetMonitor = TelnetMonitor(int(cfg.TELNET_BUFFER_SIZE))
         self.add_telnet_monitor(self.telnetMonitor)
 
         self.local_address = (httpd.server_name, httpd.server_port)
@@ -299,6 +730,9 @@ class WebDebugger(BaseDebugInterface):
             *kw.replace('+', ' ').split(',')
         )
 
+    def refresh(self):
+        return "status at %s" % datetime.now()
+
     def __str__(self):
         return "Web interface %s:%s" % (self.cfg.WEB_BIND,
                                         self.cfg.WEB_PORT,)
@@ -0,0 +1,74 @@
+import uuid
+import threading
+from time import time
+from collections import OrderedDict
+
+
+class SessionTable:
+    """Tokens of the web clients which are allowed to run commands.
+
+    Every client keeps its own token, so the clients don't invalidate
+    each other. A token expires when it isn't used in 'expires' seconds,
+    and the least recently used one is dropped when the table is full.
+    The result of a client's last command is kept until its page is
+    rendered.
+    """
+
+    def __init__(self, size=64, expires=3600):
+        self.size = size
+        self.expires = expires
+        self.sessions = OrderedDict()
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def create(self):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.purge()
+            while len(self.sessions) >= self.size:
+                self.drop(next(iter(self.sessions)))
+            self.sessions[token] = time()
+        return token
+
+    def check(self, token):
+        """return True if the token is valid, the token is kept alive."""
+        with self.lock:
+            last_used = self.sessions.get(token)
+            if last_used is None:
+                return False
+            now = time()
+            if now - last_used > self.expires:
+                self.drop(token)
+                return False
+            self.sessions[token] = now
+            self.sessions.move_to_end(token)
+            return True
+
+    def remove(self, token):
+        with self.lock:
+            self.drop(token)
+
+    def drop(self, token):
+        self.sessions.pop(token, None)
+        self.results.pop(token, None)
+
+    def set_result(self, token, result):
+        with self.lock:
+            if token in self.sessions:
+                self.results[token] = result
+
+    def pop_result(self, token):
+        with self.lock:
+            return self.results.pop(token, None)
+
+    def purge(self):
+        """drop the expired tokens, the oldest ones are at the front."""
+        deadline = time() - self.expires
+        while self.sessions:
+            token, last_used = next(iter(self.sessions.items()))
+            if last_used > deadline:
+                break
+            self.drop(token)
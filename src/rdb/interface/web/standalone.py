@@ -15,10 +15,10 @@ import traceback
 import socket
 from urllib.parse import unquote
 from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
-from robot.serializing import Template
 from rdb.RobotDebugger import DebugSetting
 from .wsgi_proxy import WSGIProxyApplication
-from . import templates
+from .cache import TEMPLATES
+from .commands import CommandRegistry
 
 SERVER_CONTEXT = None
 
@@ -30,34 +30,14 @@ class HttpServletApp:
         self.output = []
         self.logger = logging.getLogger("http")
 
-        actions = ManageActions()
+        commands = SERVER_CONTEXT.commands
         url = environ['PATH_INFO']
-        command = url.split("/")[2]
-        if command and hasattr(actions, command):
-            action = getattr(actions, command)
-        else:
-            action = actions.status
+        action = commands.get(url.split("/")[2]) or commands.get('status')
 
         result = ()
         self.params = self.__parse_param(environ['QUERY_STRING'])
-        if action.func_defaults:
-            reqiured_args_count = (
-                action.func_code.co_argcount - len(action.func_defaults)
-            )
-        else:
-            reqiured_args_count = action.func_code.co_argcount
-        var_names = action.func_code.co_varnames
-        reqiured_args, options_args = (
-            var_names[:reqiured_args_count],
-            var_names[reqiured_args_count:]
-        )
         try:
-            args, kw_args = self.__parse_args(
-                self.params,
-                reqiured_args,
-                options_args,
-            )
-            result = action(*args, **kw_args)
+            result = action(self.params)
         except Exception as e:
             self.logger.exception(e)
             result = "Exception:%s\n%s" % (e, traceback.format_exc())
@@ -83,8 +63,7 @@ class HttpServletApp:
             )
         elif isinstance(result, tuple):
             template_name, param = result[:2]
-            template = getattr(templates, template_name)
-            self.output.append(Template(template=template).generate(param))
+            self.output.append(TEMPLATES.generate(template_name, param))
             start_response(
                 "200 OK",
                 [
@@ -115,25 +94,14 @@ class HttpServletApp:
             p[k] = unquote(v)
         return p
 
-    def __parse_args(self, args, reqiured_args, options_args):
-        param = []
-        for name in reqiured_args:
-            if 'self' == name:
-                continue
-            if not args.has_key(name):
-                raise RuntimeError("Not found required parameter '%s'" % name)
-            param.append(args[name])
-        kw_param = {}
-        for name in options_args:
-            if args.has_key(name):
-                kw_param[str(name)] = args[name]
-        return (param, kw_param)
-
     def __iter__(self):
         return iter(self.output)
 
 
 class ManageActions:
+    COMMANDS = ('start_rdb', 'done_rdb', 'stop_proxy', 'proxy_status',
+                'proxy_help', 'status')
+
     def start_rdb(self, host, port):
         rdb = SERVER_CONTEXT.rdb
         rdb.server_name = host
@@ -190,6 +158,8 @@ class ApplicationContext:
         self.app_setting = app_setting
         self.active_rdb = RDBInfo()
         self.proxy_exception = None
+        self.commands = CommandRegistry()
+        self.commands.add_methods(ManageActions(), ManageActions.COMMANDS)
 
     @property
     def rdb(self):
@@ -292,6 +262,7 @@ def main(config_file='', ):
             app_settings.load_from_file(config_path)
 
         init_sys_logging(app_settings)
+        TEMPLATES.reload = app_settings.WEB_TEMPLATE_RELOAD == 'Y'
         logger = logging.getLogger("rdb.proxy")
         logger.info("Loading RDB proxy at %s" % work_root)
 
@@ -146,6 +146,8 @@ div.mml_output{
     width:100%%;
     height:400px;
     overflow:scroll;
+    white-space:pre-wrap;
+    font-family:monospace;
 }
 
 %(BUTTON_STYLE)s
@@ -153,7 +155,7 @@ div.mml_output{
 """ % {'BUTTON_STYLE': _BUTTON_STYLE}
 
 CALL_STACK = """
-<table class='app'>
+<table class='app' id='call_stack'>
 <tr>
   <th width="80px">Type</th>
   <th>Name</th>
@@ -176,18 +178,20 @@ BREAK_POINTS = """
 <tr>
   <th width="50px">Enable</th>
   <th>Name</th>
+  <th width="80px">Hits</th>
   <th width="50px">Action</th>
 </tr>
 <!-- FOR ${bp} IN ${break_points} -->
 <tr class='${bp.css_class}'>
   <td><a href="/update_breakpoint?sid=${session}&name=${bp.name}">${bp.active}</a></td><!-- # noqa, E501 -->
   <td>${bp.kw_name}</td>
-  <td></td>
+  <td>${bp.hits} ${bp.hit_condition}</td>
+  <td><a href="/reset_breakpoint_hits?sid=${session}&name=${bp.name}">Reset</a></td><!-- # noqa, E501 -->
 </tr>
 <!-- END FOR -->
 <tr>
   <td><b>Add</b></td>
-  <td>
+  <td colspan='2'>
       <form action="/add_breakpoint?sid=${session}" method='GET'>
           <input type='hidden' name="sid" value="${session}"/>
           <input type='text' name="bp" size="20"/>
@@ -305,26 +309,100 @@ DEBUGGER_TEMPLATE = """
 <meta http-equiv="Expires" content="Mon, 20 Jan 2001 20:01:21 GMT" />
 %(STYLE)s
 <script type="text/javascript">
-    //stop to refresh page if have any click in page.
-    //Have not use 'meta http-equiv="refresh"', because it can't canceled by javascript.
-    var reload_event;
-    var interval = ${refresh_interval} * 1000;
+    //the server blocks '/api/wait' until the debugger state is changed.
+    //The call stack is updated from the returned state, the page is
+    //reloaded only if the program is paused, resumed, or the breakpoints
+    //or variables are changed. An idle page only keeps one request open.
+    var generation = ${generation};
+    var structure = ${structure};
+    var hold_until = 0;
+    var poll_time = 0;
     function stop_refresh(){
-        if(reload_event){
-            window.clearInterval(reload_event);
-            //refresh page if no action in 30 seconds.
-            reload_event = window.setInterval(xxxx, 30 * 1000);
-            if(interval < 10 * 1000){
-                var msg = document.getElementById('status_msg');
-                msg.innerHTML = "<span style='color:#ff33cc;'><b>Robot is running, The page is stopped to refresh. Please click 'refresh' to check robot status.</b></span>";
+        //the user may be typing, don't reload the page in 30 seconds.
+        hold_until = new Date().getTime() + 30 * 1000;
+    }
+    function reload_page(){
+        var delay = hold_until - new Date().getTime();
+        if(delay > 0){
+            var msg = document.getElementById('status_msg');
+            msg.innerHTML = "<span style='color:#ff33cc;'><b>Robot status is changed, The page is stopped to refresh. Please click 'refresh' to check robot status.</b></span>";
+            window.setTimeout(reload_page, delay);
+            return;
+        }
+        window.location.href = '/refresh?sid=${session}';
+    }
+    function update_call_stack(frames){
+        var table = document.getElementById('call_stack');
+        if(!table){
+            return;
+        }
+        var body = table.rows[0].parentNode;
+        while(table.rows.length > 1){
+            body.removeChild(table.rows[1]);
+        }
+        for(var i = frames.length - 1; i >= 0; i--){
+            var row = document.createElement('tr');
+            var cells = [frames[i].type, frames[i].name,
+                         frames[i].starttime, frames[i].state];
+            for(var j = 0; j < cells.length; j++){
+                var cell = document.createElement('td');
+                cell.appendChild(document.createTextNode(cells[j]));
+                row.appendChild(cell);
             }
+            body.appendChild(row);
         }
     }
-    function xxxx(){
-        window.location.href = '/refresh'
+    //the polls are at least one second apart.
+    function next_poll(){
+        var delay = poll_time + 1000 - new Date().getTime();
+        window.setTimeout(wait_state, delay > 0 ? delay : 0);
+    }
+    function wait_state(){
+        var request = new XMLHttpRequest();
+        poll_time = new Date().getTime();
+        request.open('GET', '/api/wait?generation=' + generation);
+        request.onload = function(){
+            if(request.status == 200){
+                var state = JSON.parse(request.responseText);
+                if(state.structure != structure){
+                    reload_page();
+                    return;
+                }
+                generation = state.generation;
+                update_call_stack(state.call_stack);
+                next_poll();
+            }else if(request.status == 304){
+                wait_state();
+            }else{
+                window.setTimeout(wait_state, 5 * 1000);
+            }
+        };
+        request.onerror = function(){
+            window.setTimeout(wait_state, 5 * 1000);
+        };
+        request.send();
     }
     function schedule_reload(){
-        reload_event = window.setInterval(xxxx, interval);
+        wait_state();
+        start_monitor();
+    }
+    //append the telnet output pushed by server.
+    function start_monitor(){
+        var output = document.getElementById('monitor_output');
+        if(!window.EventSource || !output){
+            return;
+        }
+        var source = new EventSource('/monitor_stream');
+        source.onmessage = function(event){
+            var scrolled = output.scrollTop + output.clientHeight >= output.scrollHeight;
+            output.appendChild(document.createTextNode(event.data));
+            if(output.childNodes.length > 1000){
+                output.removeChild(output.firstChild);
+            }
+            if(scrolled){
+                output.scrollTop = output.scrollHeight;
+            }
+        };
     }
 </script>
 <title>${title}</title>
@@ -374,6 +452,12 @@ DEBUGGER_TEMPLATE = """
                     %(LISTENER)s
                 </td>
             </tr>
+            <tr>
+                <td colspan='2'>
+                    <b>Telnet output</b>
+                    <div class='mml_output' id='monitor_output'></div>
+                </td>
+            </tr>
         </table>
     </div>
 </body>
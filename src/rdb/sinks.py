@@ -0,0 +1,103 @@
+import os
+import time
+import threading
+
+
+class FileSink:
+    """A buffered file writer for the monitor and case status outputs.
+
+    The written text is collected in memory and written to file in one
+    call when the buffer is full or 'flush_interval' seconds passed since
+    last flush. A background thread flushes the text left in the buffer
+    when no more is written. The file is rotated when it's larger than
+    'max_bytes', 'backup_count' old files are kept as 'path.1', 'path.2'...
+    """
+
+    def __init__(self, path, buffer_size=64 * 1024, flush_interval=1.0,
+                 max_bytes=0, backup_count=3, ascii_only=False):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.ascii_only = ascii_only
+        self.lock = threading.Lock()
+        self.chunks = []
+        self.pending = 0
+        self.written = 0
+        self.last_flush = time.time()
+        self.output = open(path, 'w')
+        self.stopped = threading.Event()
+        self.thread = None
+        if flush_interval > 0:
+            self.thread = threading.Thread(target=self.run,
+                                           name='rdb.sink')
+            self.thread.daemon = True
+            self.thread.start()
+
+    @classmethod
+    def from_settings(cls, path, settings, ascii_only=False):
+        return cls(
+            path,
+            int(settings.SINK_BUFFER_SIZE),
+            float(settings.SINK_FLUSH_INTERVAL),
+            int(settings.SINK_MAX_BYTES),
+            int(settings.SINK_BACKUP_COUNT),
+            ascii_only
+        )
+
+    def write(self, text):
+        text = str(text)
+        if self.ascii_only:
+            text = text.encode('ascii', 'ignore').decode('ascii')
+        if not text:
+            return
+        with self.lock:
+            self.chunks.append(text)
+            self.pending += len(text)
+            if self.pending >= self.buffer_size or (
+                    self.flush_interval and
+                    time.time() - self.last_flush >= self.flush_interval):
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def run(self):
+        while not self.stopped.wait(self.flush_interval):
+            if self.chunks and (time.time() - self.last_flush >=
+                                self.flush_interval):
+                self.flush()
+
+    def _flush(self):
+        self.last_flush = time.time()
+        if not self.chunks:
+            return
+        data = "".join(self.chunks)
+        self.chunks = []
+        self.pending = 0
+        if self.max_bytes and self.written + len(data) > self.max_bytes:
+            self._rotate()
+        self.output.write(data)
+        self.output.flush()
+        self.written += len(data)
+
+    def _rotate(self):
+        self.output.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                name = "%s.%s" % (self.path, i)
+                if os.path.exists(name):
+                    os.replace(name, "%s.%s" % (self.path, i + 1))
+            os.replace(self.path, self.path + ".1")
+        self.output = open(self.path, 'w')
+        self.written = 0
+
+    def close(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        with self.lock:
+            self._flush()
+            self.output.close()